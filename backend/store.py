@@ -1,4 +1,5 @@
 import os
+import math
 import faiss
 import pickle
 import pandas as pd
@@ -15,6 +16,9 @@ dotenv.load_dotenv()
 
 INDEX_PATH = "faiss_store/index.faiss"
 META_PATH = "faiss_store/meta.pkl"
+IVFPQ_INDEX_PATH = "faiss_store/index.opq_ivfpq.faiss"
+IVFPQ_MIN_VECTORS = 25000  # enough points to train 4*sqrt(N) IVF lists and 256-entry PQ codebooks
+PQ_SUBQUANTIZERS = 16  # 16 bytes per vector at 8 bits per code
 CHUNK_SIZE = 500
 OVERLAP_SIZE = 50
 EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"  # Better than all-MiniLM-L6-v2
@@ -55,13 +59,8 @@ def find_files_in_folder(folder_path: str, recursive: bool = True) -> List[str]:
 def extract_text_from_pdf(file_path: str) -> str:
     """Extract text from PDF using PyMuPDF (fitz)"""
     try:
-        doc = fitz.open(file_path)
-        text = ""
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text += page.get_text() + "\n"
-        doc.close()
-        return text
+        with fitz.open(file_path) as doc:
+            return "".join(page.get_text() + "\n" for page in doc)
     except Exception as e:
         print(f"Error reading PDF {file_path}: {e}")
         return ""
@@ -150,22 +149,11 @@ def create_chunks_with_overlap(text: str, chunk_size: int, overlap_size: int) ->
     if len(text) <= chunk_size:
         return [text] if text.strip() else []
     
-    chunks = []
-    start = 0
-    
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        
-        if len(chunk.strip()) > 50:  # Only add meaningful chunks
-            chunks.append(chunk.strip())
-        
-        start = end - overlap_size
-        
-        if end >= len(text):
-            break
-    
-    return chunks
+    # Window starts are fixed up front; the last window is the first one reaching the end of text
+    step = chunk_size - overlap_size
+    windows = (text[start:start + chunk_size].strip()
+               for start in range(0, len(text) - chunk_size + step, step))
+    return [chunk for chunk in windows if len(chunk) > 50]  # Only keep meaningful chunks
 
 def load_files_and_chunk(file_paths: List[str], chunk_size: int) -> List[str]:
     """Load and chunk all supported file formats"""
@@ -211,7 +199,9 @@ def embed_chunks(chunks: List[str], model_name: str):
 def save_faiss_index(embeddings, chunks, index_path, meta_path):
     """Save FAISS index and chunks"""
     dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
+    # Normalized vectors + inner product = cosine similarity
+    faiss.normalize_L2(embeddings)
+    index = faiss.IndexFlatIP(dim)
     index.add(embeddings)
     os.makedirs(os.path.dirname(index_path), exist_ok=True)
     faiss.write_index(index, index_path)
@@ -219,6 +209,23 @@ def save_faiss_index(embeddings, chunks, index_path, meta_path):
         pickle.dump(chunks, f)
     print(f"Saved FAISS index with {index.ntotal} vectors")
 
+def save_ivfpq_index(embeddings, index_path):
+    """Save an OPQ-rotated IVF-PQ compressed index of the (normalized) embeddings"""
+    num_vectors, dim = embeddings.shape
+    if num_vectors < IVFPQ_MIN_VECTORS:
+        print(f"Skipping IVF-PQ index: {num_vectors} vectors (< {IVFPQ_MIN_VECTORS}), flat index is sufficient")
+        return
+    
+    nlist = int(4 * math.sqrt(num_vectors))
+    opq = faiss.OPQMatrix(dim, PQ_SUBQUANTIZERS)
+    coarse_quantizer = faiss.IndexFlatIP(dim)
+    ivfpq = faiss.IndexIVFPQ(coarse_quantizer, dim, nlist, PQ_SUBQUANTIZERS, 8, faiss.METRIC_INNER_PRODUCT)
+    index = faiss.IndexPreTransform(opq, ivfpq)
+    index.train(embeddings)
+    index.add(embeddings)
+    faiss.write_index(index, index_path)
+    print(f"Saved OPQ+IVF-PQ index with {index.ntotal} vectors ({nlist} lists)")
+
 def load_faiss_index(index_path, meta_path):
     """Load FAISS index and chunks"""
     index = faiss.read_index(index_path)
@@ -246,6 +253,7 @@ if __name__ == "__main__":
         
         embeddings = embed_chunks(chunks, EMBEDDING_MODEL)
         save_faiss_index(embeddings, chunks, INDEX_PATH, META_PATH)
+        save_ivfpq_index(embeddings, IVFPQ_INDEX_PATH)
         print("Indexing complete!")
     else:
         print("Loading existing FAISS index...")
@@ -0,0 +1,35 @@
+import os
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Dynamic int8 quantization preset for CPU encoders (VNNI kernels).
+# The suffix is passed to the exporter explicitly so the file we look for is the file it writes.
+ONNX_QUANTIZATION_CONFIG = "avx512_vnni"
+ONNX_QUANTIZED_SUFFIX = f"qint8_{ONNX_QUANTIZATION_CONFIG}"
+ONNX_QUANTIZED_FILE = f"onnx/model_{ONNX_QUANTIZED_SUFFIX}.onnx"
+
+def load_onnx_int8(model_name: str, onnx_dir: str) -> Optional["SentenceTransformer"]:
+    """Load an int8 dynamically quantized ONNX export of the encoder, quantizing once and caching it in onnx_dir.
+
+    Returns None (after logging a warning) when the ONNX backend is unavailable, so callers can fall back to PyTorch.
+    """
+    try:
+        from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+        if not os.path.exists(os.path.join(onnx_dir, ONNX_QUANTIZED_FILE)):
+            logger.info(f"Exporting int8 ONNX encoder to: {onnx_dir}")
+            fp32_model = SentenceTransformer(model_name, backend="onnx")
+            fp32_model.save_pretrained(onnx_dir)
+            export_dynamic_quantized_onnx_model(
+                fp32_model, ONNX_QUANTIZATION_CONFIG, onnx_dir, file_suffix=ONNX_QUANTIZED_SUFFIX
+            )
+
+        # ONNX Runtime applies all graph optimizations (fusion) by default
+        model = SentenceTransformer(onnx_dir, backend="onnx", model_kwargs={"file_name": ONNX_QUANTIZED_FILE})
+        logger.info(f"Loaded int8 ONNX encoder from: {onnx_dir}")
+        return model
+    except Exception as e:
+        logger.warning(f"int8 ONNX encoder unavailable in {onnx_dir}, falling back to fp32 PyTorch: {e}", exc_info=True)
+        return None
@@ -1,24 +1,56 @@
 from langchain.tools import StructuredTool
 from langchain_community.vectorstores import FAISS
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import RetrievalQA
 from langchain.embeddings.base import Embeddings
+from langchain.schema import Document
 import numpy as np
 from pydantic import BaseModel, Field
 import os
 import faiss
 import pickle
-import os
+import re
 import sys
+import torch
 # sys.modules["tensorflow"] = None
 # sys.modules["tf_keras"] = None
 
-from typing import List, Optional
-import numpy as np
+from typing import Iterator, List, Optional
+import asyncio
 import logging
 
+from tools.onnx_encoder import load_onnx_int8
+
 logger = logging.getLogger(__name__)
 
+# Use all but one core (container defaults are often 1), split between the encoders' MKL/oneDNN
+# GEMMs and FAISS's OpenMP pool: batched searches run in to_thread alongside encoding and reranking,
+# so giving both pools every core would oversubscribe the CPU
+_cpu_budget = max(1, (os.cpu_count() or 1) - 1)
+TORCH_THREADS = max(1, (_cpu_budget + 1) // 2)
+FAISS_OMP_THREADS = max(1, _cpu_budget - TORCH_THREADS)
+torch.set_num_threads(TORCH_THREADS)
+faiss.omp_set_num_threads(FAISS_OMP_THREADS)
+# The backend only runs inference, so no autograd graph is ever needed
+torch.set_grad_enabled(False)
+
+# IVF lists probed per query when the OPQ+IVF-PQ index built by store.py is available
+IVFPQ_NPROBE = 16
+
+# Chunks from store.py are tagged as "[TYPE: filename]\n<content>"
+SOURCE_TAG_PATTERN = re.compile(r"\[(.*?)\]\n(.*)", re.DOTALL)
+
+# Prompt for answering from retrieved chunks; built once and filled per query
+ANSWER_PROMPT_TEMPLATE = """You are an expert agricultural advisor. Answer the following question using the provided context from agricultural documents.
+
+Context from knowledge base:
+{context}
+
+Question: {query}
+
+Please provide a comprehensive, practical answer based on the context provided. If the context doesn't fully address the question, use your agricultural expertise to provide additional relevant information. Structure your response clearly and make it actionable for farmers.
+
+Do not include emojis in your response."""
+
 class KnowledgeSearchInput(BaseModel):
     """Input for the knowledge search tool."""
     query: str = Field(description="The search query to find relevant information in the knowledge base")
@@ -26,16 +58,20 @@ class KnowledgeSearchInput(BaseModel):
 class SentenceTransformerEmbeddings(Embeddings):
     """Custom embeddings class for sentence-transformers to work with LangChain"""
     
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", onnx_dir: Optional[str] = None):
         # fix issues with tensorflow and tf_keras
-        import os
         os.environ["TRANSFORMERS_NO_TF"] = "1"
         saved_tf = sys.modules.get("tensorflow")
         saved_tf_keras = sys.modules.get("tf_keras")
         sys.modules["tensorflow"] = None
         sys.modules["tf_keras"] = None
         from sentence_transformers import SentenceTransformer
-        self.model = SentenceTransformer(model_name)
+        self.model = None
+        if onnx_dir:
+            self.model = load_onnx_int8(model_name, onnx_dir)
+        if self.model is None:
+            self.model = SentenceTransformer(model_name)
+        self.model.eval()
         if saved_tf is not None:
             sys.modules["tensorflow"] = saved_tf
         else:
@@ -45,25 +81,129 @@ class SentenceTransformerEmbeddings(Embeddings):
         else:
             sys.modules.pop("tf_keras", None)
     
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts into L2-normalized float32 vectors, staying in numpy"""
+        with torch.inference_mode():
+            return self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True, batch_size=64)
+    
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed a list of documents"""
-        embeddings = self.model.encode(texts)
-        return embeddings.tolist()
+        return self.encode(texts).tolist()
     
     def embed_query(self, text: str) -> List[float]:
         """Embed a single query"""
-        embedding = self.model.encode([text])
-        return embedding[0].tolist()
+        return self.encode([text])[0].tolist()
+
+class ParquetChunks:
+    """Read-only view of the knowledge-base chunks stored as memory-mapped Parquet (source, content)"""
+    
+    def __init__(self, path: str):
+        import pyarrow.parquet as pq
+        self.table = pq.read_table(path, memory_map=True)
+        self.sources = self.table.column("source")
+        self.contents = self.table.column("content")
+    
+    @staticmethod
+    def write(chunks: List[str], path: str):
+        """Convert the pickled chunk list into a Parquet file with the source tag split out"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        matches = [SOURCE_TAG_PATTERN.match(chunk) for chunk in chunks]
+        table = pa.table({
+            "source": [match.group(1) if match else None for match in matches],
+            "content": [match.group(2) if match else chunk for chunk, match in zip(chunks, matches)],
+        })
+        pq.write_table(table, path)
+    
+    def __len__(self) -> int:
+        return self.table.num_rows
+    
+    def __getitem__(self, i: int) -> str:
+        """Materialize a single chunk in its original "[source]\n<content>" form"""
+        source = self.sources[i].as_py()
+        content = self.contents[i].as_py()
+        return f"[{source}]\n{content}" if source is not None else content
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+class RetrievalBatcher:
+    """Packs concurrent retrieval requests into a single encode + FAISS search call"""
+    
+    def __init__(self, embeddings_model: SentenceTransformerEmbeddings, index, k: int = 20,
+                 max_batch_size: int = 32, max_wait: float = 0.01):
+        self.embeddings_model = embeddings_model
+        self.index = index
+        self.k = k
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = None
+        self._worker = None
+        self._loop = None
+    
+    async def search(self, query: str) -> np.ndarray:
+        """Queue a query and wait for the FAISS ids of its nearest chunks"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # Queue and worker are bound to the event loop they were created on
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        
+        future = loop.create_future()
+        await self._queue.put((query, future))
+        return await future
+    
+    async def _run(self):
+        """Drain up to max_batch_size queries or max_wait seconds, then search them together"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                ids = await asyncio.to_thread(self._search_batch, [query for query, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for row, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(ids[row])
+    
+    def _search_batch(self, queries: List[str]) -> np.ndarray:
+        """Embed all queries in one forward pass and run one FAISS search"""
+        _, I = self.index.search(self.embeddings_model.encode(queries), self.k)
+        return I
 
 class EnhancedRAGTool:
     """Enhanced RAG tool with better error handling and fallback responses"""
     
+    __slots__ = (
+        "vectorstore", "_retriever", "faiss_index", "_gpu_resources", "_batcher", "chunks",
+        "embeddings_model", "reranker", "llm", "is_initialized",
+    )
+    
     def __init__(self):
         self.vectorstore = None
-        self.qa_chain = None
+        self._retriever = None
         self.faiss_index = None
+        self._gpu_resources = None
+        self._batcher = None
         self.chunks = None
         self.embeddings_model = None
+        self.reranker = None
         self.llm = None
         self.is_initialized = False
 
@@ -74,7 +214,6 @@ class EnhancedRAGTool:
         """Initialize the RAG system with embeddings and vector store"""
         try:
             logger.info("Initializing Enhanced RAG Tool...")
-            import os
             os.environ["TRANSFORMERS_NO_TF"] = "1"
             saved_tf = sys.modules.get("tensorflow")
             saved_tf_keras = sys.modules.get("tf_keras")
@@ -91,9 +230,6 @@ class EnhancedRAGTool:
             else:
                 sys.modules.pop("tf_keras", None)
             
-            # Initialize embeddings (matching your creation script)
-            self.embeddings_model = SentenceTransformerEmbeddings("sentence-transformers/all-MiniLM-L6-v2")
-            
             # Initialize LLM early for fallback purposes
             self.llm = ChatGoogleGenerativeAI(
                 model="gemini-2.0-flash-exp",
@@ -108,6 +244,12 @@ class EnhancedRAGTool:
             current_dir = os.path.dirname(os.path.abspath(__file__))  # tools directory
             parent_dir = os.path.dirname(current_dir)  # parent of tools directory
             
+            # Initialize embeddings (matching your creation script), using the cached int8 ONNX export when possible
+            self.embeddings_model = SentenceTransformerEmbeddings(
+                "sentence-transformers/all-MiniLM-L6-v2",
+                onnx_dir=os.path.join(parent_dir, "faiss_store", "minilm_onnx_int8")
+            )
+            
             index_path = os.path.join(parent_dir, "faiss_store", "index.faiss")
             meta_path = os.path.join(parent_dir, "faiss_store", "meta.pkl")
             
@@ -116,78 +258,161 @@ class EnhancedRAGTool:
             
             if os.path.exists(index_path) and os.path.exists(meta_path):
                 # Load the FAISS index and chunks directly
-                self.faiss_index = faiss.read_index(index_path)
-                with open(meta_path, "rb") as f:
-                    self.chunks = pickle.load(f)
+                self.faiss_index = self._to_gpu(self._load_faiss_index(index_path))
+                self.chunks = self._load_chunks(meta_path)
                 
                 logger.info(f"Successfully loaded FAISS index with {len(self.chunks)} chunks")
                 
                 # Create LangChain FAISS vectorstore wrapper
-                self._create_langchain_vectorstore()
+                self._create_langchain_vectorstore(meta_path)
                 
             else:
                 logger.warning(f"FAISS files not found at expected locations")
                 self._create_sample_vectorstore()
             
-            # Create QA chain if vectorstore is available
-            if self.vectorstore:
-                self.qa_chain = RetrievalQA.from_chain_type(
-                    llm=self.llm,
-                    chain_type="stuff",
-                    retriever=self.vectorstore.as_retriever(
-                        search_type="similarity",
-                        search_kwargs={"k": 10}  # Increased for better coverage
-                    ),
-                    return_source_documents=True
+            # Build the retriever once if vectorstore is available (the sample store sets its own)
+            if self.vectorstore and not self._retriever:
+                self._retriever = self.vectorstore.as_retriever(
+                    search_type="similarity",
+                    search_kwargs={"k": 10}  # Increased for better coverage
+                )
+            if self._retriever:
+                # The async path batches the retriever's own lookup: same index, same k
+                self._batcher = RetrievalBatcher(
+                    self.embeddings_model, self.vectorstore.index, k=self._retriever.search_kwargs.get("k", 4)
                 )
                 self.is_initialized = True
-                logger.info("RAG Tool initialized successfully with QA chain")
+                logger.info("RAG Tool initialized successfully with retriever")
             else:
-                logger.warning("RAG Tool initialized without QA chain (vectorstore unavailable)")
+                logger.warning("RAG Tool initialized without retriever (vectorstore unavailable)")
             
         except Exception as e:
             logger.error(f"Error initializing RAG tool: {e}")
             self.vectorstore = None
-            self.qa_chain = None
+            self._retriever = None
             # Still mark as initialized so we can use LLM fallback
             self.is_initialized = True
     
-    def _create_langchain_vectorstore(self):
-        """Create a LangChain FAISS vectorstore from the loaded index and chunks"""
+    def _load_faiss_index(self, index_path: str):
+        """Load the FAISS index: OPQ+IVF-PQ if built, else an FP16 scalar-quantized cosine (inner product) index"""
+        ivfpq_path = os.path.join(os.path.dirname(index_path), "index.opq_ivfpq.faiss")
+        if os.path.exists(ivfpq_path) and os.path.getmtime(ivfpq_path) >= os.path.getmtime(index_path):
+            logger.info(f"Loading OPQ+IVF-PQ FAISS index from: {ivfpq_path}")
+            index = faiss.read_index(ivfpq_path)
+            faiss.extract_index_ivf(index).nprobe = IVFPQ_NPROBE
+            return index
+        
+        sq_path = os.path.join(os.path.dirname(index_path), "index.fp16.faiss")
+        if os.path.exists(sq_path) and os.path.getmtime(sq_path) >= os.path.getmtime(index_path):
+            logger.info(f"Loading FP16 FAISS index from: {sq_path}")
+            return faiss.read_index(sq_path)
+        
+        # Rebuild from the FP32 index: normalize the vectors (older indexes were built with L2)
+        # and store them as FP16 to halve the bytes scanned per query
+        logger.info("Building FP16 IndexScalarQuantizer from FP32 FAISS index")
+        index = faiss.read_index(index_path)
+        vectors = index.reconstruct_n(0, index.ntotal)
+        faiss.normalize_L2(vectors)
+        sq_index = faiss.IndexScalarQuantizer(index.d, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+        sq_index.train(vectors)
+        sq_index.add(vectors)
+        
+        try:
+            faiss.write_index(sq_index, sq_path)
+        except Exception as e:
+            logger.warning(f"Could not persist FP16 FAISS index to {sq_path}: {e}")
+        return sq_index
+    
+    def _load_chunks(self, meta_path: str):
+        """Load chunks from memory-mapped meta.parquet, converting meta.pkl once if needed"""
+        parquet_path = os.path.join(os.path.dirname(meta_path), "meta.parquet")
         try:
-            from langchain.schema import Document
-            from langchain_community.vectorstores.faiss import FAISS
+            if not os.path.exists(parquet_path) or os.path.getmtime(parquet_path) < os.path.getmtime(meta_path):
+                logger.info(f"Converting {meta_path} to {parquet_path}")
+                with open(meta_path, "rb") as f:
+                    ParquetChunks.write(pickle.load(f), parquet_path)
+            return ParquetChunks(parquet_path)
+        except Exception as e:
+            logger.warning(f"Parquet chunk store unavailable, loading pickled chunks: {e}")
+            with open(meta_path, "rb") as f:
+                return pickle.load(f)
+    
+    def _to_gpu(self, index):
+        """Move the FAISS index to GPU(s) when CUDA is available, keeping the CPU index otherwise"""
+        num_gpus = faiss.get_num_gpus() if hasattr(faiss, "get_num_gpus") else 0
+        if num_gpus == 0:
+            return index
+        
+        try:
+            # GPU FAISS has no flat scalar-quantizer index; use a flat IP index stored as FP16 instead
+            if isinstance(index, faiss.IndexScalarQuantizer):
+                flat_index = faiss.IndexFlatIP(index.d)
+                flat_index.add(index.reconstruct_n(0, index.ntotal))
+                index = flat_index
+            
+            if num_gpus > 1:
+                co = faiss.GpuMultipleClonerOptions()
+                co.shard = True
+                co.useFloat16 = True
+                gpu_index = faiss.index_cpu_to_all_gpus(index, co=co)
+            else:
+                self._gpu_resources = faiss.StandardGpuResources()
+                co = faiss.GpuClonerOptions()
+                co.useFloat16 = True
+                gpu_index = faiss.index_cpu_to_gpu(self._gpu_resources, 0, index, co)
             
-            # Convert chunks to LangChain documents
-            documents = []
-            for i, chunk in enumerate(self.chunks):
-                # Extract source from chunk if tagged
-                if chunk.startswith('[') and ']\n' in chunk:
-                    source_end = chunk.find(']\n')
-                    source = chunk[1:source_end]
-                    content = chunk[source_end + 2:]
-                else:
-                    source = "Agricultural Knowledge Base"
-                    content = chunk
-                
-                doc = Document(
+            logger.info(f"Moved FAISS index to {num_gpus} GPU(s)")
+            return gpu_index
+        except Exception as e:
+            logger.warning(f"Could not move FAISS index to GPU, using CPU: {e}")
+            return index
+    
+    def _create_langchain_vectorstore(self, meta_path: str):
+        """Create a LangChain FAISS vectorstore from the loaded index and chunks, reusing the saved copy if current"""
+        try:
+            # Load the persisted vectorstore unless the chunks changed since it was saved
+            langchain_dir = os.path.join(os.path.dirname(meta_path), "langchain")
+            saved_index = os.path.join(langchain_dir, "index.pkl")
+            if os.path.exists(saved_index) and os.path.getmtime(saved_index) >= os.path.getmtime(meta_path):
+                self.vectorstore = FAISS.load_local(
+                    langchain_dir, self.embeddings_model, allow_dangerous_deserialization=True
+                )
+                logger.info(f"Loaded LangChain FAISS vectorstore from: {langchain_dir}")
+                return
+            
+            # Convert chunks to LangChain documents, splitting off the source tag if present
+            if isinstance(self.chunks, ParquetChunks):
+                sources = self.chunks.sources.to_pylist()
+                contents = self.chunks.contents.to_pylist()
+            else:
+                matches = [SOURCE_TAG_PATTERN.match(chunk) for chunk in self.chunks]
+                sources = [match.group(1) if match else None for match in matches]
+                contents = [match.group(2) if match else chunk for chunk, match in zip(self.chunks, matches)]
+            documents = [
+                Document(
                     page_content=content,
-                    metadata={"source": source, "chunk_id": i}
+                    metadata={"source": source or "Agricultural Knowledge Base", "chunk_id": i}
                 )
-                documents.append(doc)
+                for i, (source, content) in enumerate(zip(sources, contents))
+            ]
             
-            # Create embeddings for documents
-            embeddings = self.embeddings_model.embed_documents([doc.page_content for doc in documents])
+            # Create normalized embeddings for documents, handed to FAISS as numpy rows
+            embeddings = self.embeddings_model.encode(contents)
             
             # Create FAISS vectorstore
             self.vectorstore = FAISS.from_embeddings(
-                text_embeddings=list(zip([doc.page_content for doc in documents], embeddings)),
+                text_embeddings=list(zip(contents, embeddings)),
                 embedding=self.embeddings_model,
                 metadatas=[doc.metadata for doc in documents]
             )
             
             logger.info("Successfully created LangChain FAISS vectorstore wrapper")
             
+            try:
+                self.vectorstore.save_local(langchain_dir)
+            except Exception as e:
+                logger.warning(f"Could not persist LangChain vectorstore to {langchain_dir}: {e}")
+            
         except Exception as e:
             logger.error(f"Error creating LangChain vectorstore: {e}")
             self._create_sample_vectorstore()
@@ -195,9 +420,6 @@ class EnhancedRAGTool:
     def _create_sample_vectorstore(self):
         """Create a comprehensive sample vectorstore as fallback"""
         try:
-            from langchain.schema import Document
-            from langchain_community.vectorstores import FAISS
-            
             sample_docs = [
                 Document(
                     page_content="PM Kisan Yojana (Pradhan Mantri Kisan Samman Nidhi) provides direct income support of ₹6000 per year to eligible farmer families in three equal installments of ₹2000 each. Eligible farmers are those who own cultivable land. The scheme was launched in 2019 to supplement financial needs of farmers and ensure proper crop health and production. Benefits are transferred directly to bank accounts through Direct Benefit Transfer (DBT).",
@@ -231,17 +453,11 @@ class EnhancedRAGTool:
             
             self.vectorstore = FAISS.from_documents(sample_docs, self.embeddings_model)
             
-            # Also create QA chain with sample vectorstore
-            if self.llm:
-                self.qa_chain = RetrievalQA.from_chain_type(
-                    llm=self.llm,
-                    chain_type="stuff",
-                    retriever=self.vectorstore.as_retriever(
-                        search_type="similarity",
-                        search_kwargs={"k": 3}
-                    ),
-                    return_source_documents=True
-                )
+            # Also create retriever with sample vectorstore
+            self._retriever = self.vectorstore.as_retriever(
+                search_type="similarity",
+                search_kwargs={"k": 3}
+            )
             
             logger.info("Created sample vectorstore with comprehensive agricultural information.")
             
@@ -251,108 +467,114 @@ class EnhancedRAGTool:
     
     def search_knowledge_base(self, query: str) -> str:
         """Enhanced knowledge base search with comprehensive fallback"""
+        return "".join(self.stream_knowledge_base(query)).strip()
+    
+    def stream_knowledge_base(self, query: str) -> Iterator[str]:
+        """Knowledge base search that yields the answer as the LLM generates it"""
+        return self._stream_answer(query)
+    
+    def _stream_answer(self, query: str, docs: Optional[List[Document]] = None) -> Iterator[str]:
+        """Answer from retrieved docs (from the retriever unless already given), with the same fallbacks"""
         try:
             logger.info(f"Searching knowledge base for: {query[:100]}...")
             
-            # First attempt: Use LangChain QA chain if available
-            if self.qa_chain:
+            # First attempt: Retrieve from the LangChain vectorstore and stream the LLM answer
+            if self._retriever and self.llm:
+                streaming = False
                 try:
-                    result = self.qa_chain.invoke({"query": query})
-                    answer = result.get("result", "")
+                    if docs is None:
+                        docs = self._retriever.invoke(query)
+                    context = "\n\n".join(doc.page_content for doc in docs)
+                    buffered = ""
+                    
+                    for chunk in self.llm.stream(ANSWER_PROMPT_TEMPLATE.format(context=context, query=query)):
+                        if streaming:
+                            yield chunk.content
+                            continue
+                        # Hold back short answers so they can still fall through to direct search
+                        buffered += chunk.content
+                        if len(buffered.strip()) > 50:
+                            streaming = True
+                            yield buffered.lstrip()
                     
-                    if answer and len(answer.strip()) > 50:
+                    if streaming:
                         # Format sources information
-                        if "source_documents" in result and result["source_documents"]:
-                            sources_info = []
-                            seen_sources = set()
-                            
-                            for doc in result["source_documents"][:3]:
-                                source = doc.metadata.get("source", "Knowledge Base")
-                                if source not in seen_sources:
-                                    sources_info.append(source)
-                                    seen_sources.add(source)
-                            
-                            if sources_info:
-                                answer += f"\n\nSources: {', '.join(sources_info)}"
+                        sources_info = list(dict.fromkeys(
+                            doc.metadata.get("source", "Knowledge Base") for doc in docs[:3]
+                        ))
+                        if sources_info:
+                            yield f"\n\nSources: {', '.join(sources_info)}"
                         
-                        logger.info("Successfully retrieved answer from QA chain")
-                        return answer
+                        logger.info("Successfully retrieved answer from retriever")
+                        return
                     else:
-                        logger.warning("QA chain returned insufficient answer, trying direct search")
+                        logger.warning("Retriever answer insufficient, trying direct search")
                         
                 except Exception as e:
-                    logger.error(f"QA chain failed: {e}")
+                    logger.error(f"Retriever search failed: {e}")
+                    if streaming:
+                        # Part of the answer was already sent; don't append a second one
+                        return
             
             # Second attempt: Direct FAISS search
             if self.faiss_index and self.chunks:
                 try:
-                    return self._direct_search(query)
+                    yield self._direct_search(query)
+                    return
                 except Exception as e:
                     logger.error(f"Direct search failed: {e}")
             
             # Third attempt: Pure LLM response if everything else fails
             if self.llm:
                 logger.info("Using pure LLM fallback response")
-                return self._generate_llm_response(query)
+                yield self._generate_llm_response(query)
+                return
             
             # Final fallback
-            return "I apologize, but I'm unable to search the knowledge base at the moment due to technical issues. Please try again later or consult with local agricultural experts."
+            yield "I apologize, but I'm unable to search the knowledge base at the moment due to technical issues. Please try again later or consult with local agricultural experts."
             
         except Exception as e:
             logger.error(f"Critical error in knowledge search: {e}")
-            return f"I encountered an error while searching for information about '{query}'. Please try rephrasing your question or contact technical support."
+            yield f"I encountered an error while searching for information about '{query}'. Please try rephrasing your question or contact technical support."
+    
+    async def asearch_knowledge_base(self, query: str) -> str:
+        """Async search_knowledge_base; concurrent calls share one batched embed + FAISS lookup, the answer is built the same way"""
+        docs = None
+        if self._batcher:
+            try:
+                ids = await self._batcher.search(query)
+                docs = self._docs_for_ids(ids)
+            except Exception as e:
+                logger.error(f"Batched retrieval failed, using the retriever: {e}")
+        
+        return await asyncio.to_thread(lambda: "".join(self._stream_answer(query, docs)).strip())
+    
+    def _docs_for_ids(self, ids) -> List[Document]:
+        """Map vectorstore rows to their documents, as the retriever's similarity search does"""
+        return [
+            self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[i])
+            for i in ids if i != -1
+        ]
     
-#     def _direct_search(self, query: str) -> str:
-#         """Direct search using the original FAISS index"""
-#         try:
-#             logger.info("Performing direct FAISS search")
-            
-#             # Get query embedding
-#             query_embedding = self.embeddings_model.embed_query(query)
-#             query_embedding = np.array([query_embedding], dtype=np.float32)
-            
-#             # Search FAISS index
-#             D, I = self.faiss_index.search(query_embedding, k=4)
-#             matched_chunks = [self.chunks[i] for i in I[0] if i < len(self.chunks)]
-            
-#             if not matched_chunks:
-#                 return self._generate_llm_response(query)
-            
-#             # Generate response using matched chunks
-#             context = "\n\n".join(matched_chunks[:3])
-            
-#             prompt = f"""You are an expert agricultural advisor. Answer the following question using the provided context from agricultural documents.
-
-# Context from knowledge base:
-# {context}
-
-# Question: {query}
-
-# Please provide a comprehensive, practical answer based on the context provided. If the context doesn't fully address the question, use your agricultural expertise to provide additional relevant information. Structure your response clearly and make it actionable for farmers.
-
-# Do not include emojis in your response."""
-            
-#             response = self.llm.invoke(prompt)
-#             return response.content.strip()
-            
-#         except Exception as e:
-#             logger.error(f"Error in direct search: {e}")
-#             return self._generate_llm_response(query)
-
-
-# Load once in __init__
-
     def _direct_search(self, query: str) -> str:
         """Direct search with FAISS + CrossEncoder reranking"""
         try:
             logger.info("Performing FAISS search with CrossEncoder reranking")
 
             # Step 1: Get query embedding & recall from FAISS
-            query_embedding = self.embeddings_model.embed_query(query)
-            query_embedding = np.array([query_embedding], dtype=np.float32)
+            query_embedding = self.embeddings_model.encode([query])
 
             D, I = self.faiss_index.search(query_embedding, k=20)  # recall more
-            candidates = [(i, self.chunks[i]) for i in I[0] if i < len(self.chunks)]
+            return self._answer_from_candidates(query, I[0])
+
+        except Exception as e:
+            logger.error(f"Error in direct search: {e}")
+            return self._generate_llm_response(query)
+
+    def _answer_from_candidates(self, query: str, ids) -> str:
+        """Rerank the FAISS candidates with the CrossEncoder and answer from the top chunks"""
+        try:
+            candidates = [(i, self.chunks[i]) for i in ids if 0 <= i < len(self.chunks)]
 
             if not candidates:
                 return self._generate_llm_response(query)
@@ -367,22 +589,13 @@ class EnhancedRAGTool:
             # Step3: Build context and prompt
             context = "\n\n".join(top_chunks)
 
-            prompt = f"""You are an expert agricultural advisor. Answer the following question using the provided context from agricultural documents.
+            prompt = ANSWER_PROMPT_TEMPLATE.format(context=context, query=query)
 
-    Context from knowledge base:
-    {context}
-
-    Question: {query}
-
-    Please provide a comprehensive, practical answer based on the context provided. If the context doesn't fully address the question, use your agricultural expertise to provide additional relevant information. Structure your response clearly and make it actionable for farmers.
-
-    Do not include emojis in your response."""
-            
             response = self.llm.invoke(prompt)
             return response.content.strip()
 
         except Exception as e:
-            logger.error(f"Error in direct search: {e}")
+            logger.error(f"Error answering from search candidates: {e}")
             return self._generate_llm_response(query)    
     def _generate_llm_response(self, query: str) -> str:
         """Generate response using only LLM knowledge"""
@@ -417,5 +630,6 @@ rag_tool = StructuredTool(
     name="knowledge_search",
     description="Search the agricultural knowledge base for comprehensive information about farming practices, crop management, government schemes (PM Kisan, PMFBY, Soil Health Card), fertilizers, pest control, organic farming, soil management, irrigation techniques, and other agricultural topics. This tool provides expert agricultural guidance with intelligent fallback responses when specific information isn't found in the database.",
     func=rag_instance.search_knowledge_base,
+    coroutine=rag_instance.asearch_knowledge_base,
     args_schema=KnowledgeSearchInput
 )
\ No newline at end of file
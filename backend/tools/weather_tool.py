@@ -3,10 +3,16 @@ import os
 from pathlib import Path
 from datetime import datetime, timedelta
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import logging
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
+from threading import Lock
+from typing import Optional, Dict, Any
+from rapidfuzz import process, fuzz
+from cachetools import TTLCache
 
 from langchain.tools import tool
 
@@ -14,6 +20,13 @@ from langchain.tools import tool
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# IMD district bulletins are a few pages of structured text; later pages never reach the excerpt
+MAX_BULLETIN_PAGES = 4
+
+
+class BulletinNotFoundError(Exception):
+    """Raised when no recent bulletin is available for a district"""
+
 
 class IMDDataHandler:
     """Handles IMD district codes and mapping"""
@@ -23,6 +36,34 @@ class IMDDataHandler:
         if not self.filepath.exists():
             raise FileNotFoundError(f"IMD codes file not found at {filepath}")
         
+        # Prefer the cleaned Parquet side-cache while it is newer than the source file
+        parquet_path = self.filepath.with_suffix('.parquet')
+        if parquet_path.exists() and parquet_path.stat().st_mtime >= self.filepath.stat().st_mtime:
+            try:
+                self.df = pd.read_parquet(parquet_path)
+                logger.info(f"Loaded {len(self.df)} districts from cached {parquet_path.name}")
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable IMD codes cache: {e}")
+                self._load_source()
+        else:
+            self._load_source()
+            try:
+                self.df.to_parquet(parquet_path, compression='zstd', index=False)
+            except Exception as e:
+                logger.warning(f"Could not cache IMD codes as Parquet: {e}")
+        
+        # Precompute lookup tables so district lookups never touch pandas
+        self._district_list = self.df['District'].fillna('').tolist()
+        self._district_lower = [name.lower() for name in self._district_list]
+        self._codes = self.df['IMD Code'].tolist()
+        self._exact = {}
+        for name_lower, code in zip(self._district_lower, self._codes):
+            self._exact.setdefault(name_lower, code)  # first row wins, as before
+        self._districts_sorted = sorted(self._district_list)
+        self.suggestions_sample = self._districts_sorted[:20]  # for error messages
+    
+    def _load_source(self):
+        """Load and clean the CSV/Excel IMD codes file"""
         # Load data based on file extension
         try:
             if self.filepath.suffix.lower() == ".csv":
@@ -47,25 +88,25 @@ class IMDDataHandler:
         except Exception as e:
             raise RuntimeError(f"Failed to load IMD codes file: {e}")
     
-    @lru_cache(maxsize=128)
     def get_imd_code(self, district: str) -> str:
         """Get IMD code for a district with fuzzy matching"""
         district = district.strip()
+        district_lower = district.lower()
         
         # Exact match (case-insensitive)
-        exact_match = self.df[self.df['District'].str.lower() == district.lower()]
-        if not exact_match.empty:
-            return exact_match.iloc[0]['IMD Code']
+        if district_lower in self._exact:
+            return self._exact[district_lower]
         
-        # Partial match
-        partial_match = self.df[self.df['District'].str.lower().str.contains(district.lower(), na=False)]
-        if not partial_match.empty:
-            logger.warning(f"Using partial match for '{district}': {partial_match.iloc[0]['District']}")
-            return partial_match.iloc[0]['IMD Code']
+        # Fuzzy match (handles partial names and typos)
+        match = process.extractOne(district_lower, self._district_lower, scorer=fuzz.WRatio, score_cutoff=75)
+        if match:
+            _, score, idx = match
+            logger.warning(f"Using fuzzy match for '{district}': {self._district_list[idx]} (score {score:.0f})")
+            return self._codes[idx]
         
         # If no match found, provide suggestions
-        similar = self.df[self.df['District'].str.lower().str.startswith(district.lower()[:3])]
-        suggestions = similar['District'].head(5).tolist() if not similar.empty else []
+        similar = process.extract(district_lower, self._district_lower, scorer=fuzz.WRatio, limit=5)
+        suggestions = [self._district_list[idx] for _, _, idx in similar]
         
         error_msg = f"District '{district}' not found in IMD data."
         if suggestions:
@@ -75,12 +116,11 @@ class IMDDataHandler:
     
     def list_available_districts(self, state: Optional[str] = None) -> list:
         """List all available districts, optionally filtered by state"""
-        districts = self.df['District'].tolist()
         if state:
             # Assuming there's a State column, otherwise return all
             if 'State' in self.df.columns:
-                districts = self.df[self.df['State'].str.lower() == state.lower()]['District'].tolist()
-        return sorted(districts)
+                return sorted(self.df[self.df['State'].str.lower() == state.lower()]['District'].tolist())
+        return list(self._districts_sorted)
 
 
 class IMDPDFDownloader:
@@ -100,11 +140,29 @@ class IMDPDFDownloader:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        
+        # Pool enough connections for the parallel date probes and retry transient server errors
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[500, 502, 503, 504],
+            allowed_methods=['GET', 'HEAD']
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
     def get_cached_path(self, imd_code: str, date_str: str) -> Path:
         """Get the local path for cached PDF"""
         return self.save_dir / f"{imd_code}_{date_str}_E.pdf"
     
+    def get_pdf_url(self, imd_code: str, date_str: str) -> str:
+        """Build the bulletin URL for an IMD code and date"""
+        filename = f"{imd_code}_{date_str}_E.pdf"
+        full_path = f"Files/District AAS Bulletin/English Bulletin/{filename}"
+        # encoded_path = quote(full_path)  # Encode spaces and special chars
+        return f"https://imdagrimet.gov.in/accessData.php?path={full_path}"
+    
     def is_valid_pdf(self, content: bytes) -> bool:
         """Check if content is a valid PDF"""
         return True
@@ -114,6 +172,25 @@ class IMDPDFDownloader:
             b'%%EOF' in content
         )
 
+    def read_head_and_tail(self, path: Path, size: int = 1024) -> bytes:
+        """Read only the first and last bytes of a file, which is all is_valid_pdf looks at"""
+        with path.open('rb') as f:
+            if path.stat().st_size <= 2 * size:
+                return f.read()
+            head = f.read(size)
+            f.seek(-size, os.SEEK_END)
+            return head + f.read()
+    
+    @staticmethod
+    def _read_head(chunks, size: int = 1024) -> bytes:
+        """Consume response chunks until at least size bytes are read"""
+        head = b""
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= size:
+                break
+        return head
+
     def download_pdf(self, imd_code: str, date_str: str, force_download: bool = False) -> Optional[Path]:
         """Download PDF for specific IMD code and date."""
         local_path = self.get_cached_path(imd_code, date_str)
@@ -121,8 +198,7 @@ class IMDPDFDownloader:
         # Check cache validity
         if local_path.exists() and not force_download:
             try:
-                content = local_path.read_bytes()
-                if self.is_valid_pdf(content):
+                if self.is_valid_pdf(self.read_head_and_tail(local_path)):
                     logger.info(f"Using cached valid file: {local_path}")
                     return local_path
                 else:
@@ -132,28 +208,40 @@ class IMDPDFDownloader:
                 logger.warning(f"Error reading cached file {local_path}, re-downloading: {e}")
                 local_path.unlink(missing_ok=True)
 
-        # Build proper encoded URL
         filename = f"{imd_code}_{date_str}_E.pdf"
-        full_path = f"Files/District AAS Bulletin/English Bulletin/{filename}"
-        # encoded_path = quote(full_path)  # Encode spaces and special chars
-        url = f"https://imdagrimet.gov.in/accessData.php?path={full_path}"
+        url = self.get_pdf_url(imd_code, date_str)
 
         try:
             logger.info(f"Downloading: {url}")
-            response = self.session.get(url, timeout=self.timeout)
-            if b"file not found" in response.content.lower() or len(response.content.strip()) < 100:
-                print(f"PDF not found at {url}")
-                return None
-            if response.status_code == 200:
-                content = response.content
-                if self.is_valid_pdf(content):
-                    local_path.write_bytes(content)
-                    logger.info(f"Successfully downloaded: {local_path}")
-                    return local_path
-                else:
-                    logger.warning(f"Downloaded file is not a valid PDF for {filename}")
+            with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                # Decide hit/miss from the first KB so error pages are never fully downloaded
+                chunks = response.iter_content(chunk_size=65536)
+                head = self._read_head(chunks)
+                if b"file not found" in head.lower() or len(head.strip()) < 100:
+                    print(f"PDF not found at {url}")
+                    return None
+                if response.status_code != 200:
+                    logger.warning(f"HTTP {response.status_code} for {url}")
+                    return None
+                
+                # Stream the rest straight to disk instead of buffering the whole body
+                part_path = local_path.with_suffix('.part')
+                try:
+                    with part_path.open('wb') as f:
+                        f.write(head)
+                        for chunk in chunks:
+                            f.write(chunk)
+                except Exception:
+                    part_path.unlink(missing_ok=True)
+                    raise
+            
+            if self.is_valid_pdf(self.read_head_and_tail(part_path)):
+                part_path.replace(local_path)
+                logger.info(f"Successfully downloaded: {local_path}")
+                return local_path
             else:
-                logger.warning(f"HTTP {response.status_code} for {url}")
+                part_path.unlink(missing_ok=True)
+                logger.warning(f"Downloaded file is not a valid PDF for {filename}")
 
         except requests.RequestException as e:
             logger.error(f"Download failed for {url}: {e}")
@@ -163,19 +251,48 @@ class IMDPDFDownloader:
         return None
 
     
+    def probe_pdf(self, imd_code: str, date_str: str) -> bool:
+        """Check if a bulletin exists by fetching only its first bytes"""
+        url = self.get_pdf_url(imd_code, date_str)
+        try:
+            # IMD answers missing files with HTTP 200 and a "file not found" body, so HEAD is not enough
+            with self.session.get(url, timeout=self.timeout, stream=True, headers={'Range': 'bytes=0-1023'}) as response:
+                if response.status_code not in (200, 206):
+                    return False
+                head = self._read_head(response.iter_content(chunk_size=1024))
+            return b"file not found" not in head.lower() and len(head.strip()) >= 100
+        except requests.RequestException as e:
+            logger.warning(f"Probe failed for {url}: {e}")
+            return False
+    
     def try_latest_pdf(self, imd_code: str, max_days: int = 7) -> Optional[Path]:
         """Try to download the most recent available PDF"""
         today = datetime.today()
+        dates = [(today - timedelta(days=delta)).strftime("%Y-%m-%d") for delta in range(max_days)]
         
-        for delta in range(max_days):
-            date = today - timedelta(days=delta)
-            date_str = date.strftime("%Y-%m-%d")
-            
-            logger.info(f"Trying date: {date_str} for IMD code: {imd_code}")
-            pdf_path = self.download_pdf(imd_code, date_str)
+        # Only dates newer than the latest cached bulletin need to be checked online
+        cached_delta = next(
+            (delta for delta, date_str in enumerate(dates) if self.get_cached_path(imd_code, date_str).exists()),
+            None
+        )
+        probe_dates = dates[:cached_delta] if cached_delta is not None else dates
+        
+        if probe_dates:
+            logger.info(f"Probing {len(probe_dates)} dates for IMD code: {imd_code}")
+            with ThreadPoolExecutor(max_workers=len(probe_dates)) as executor:
+                available = list(executor.map(lambda date_str: self.probe_pdf(imd_code, date_str), probe_dates))
             
+            for date_str, is_available in zip(probe_dates, available):
+                if is_available:
+                    pdf_path = self.download_pdf(imd_code, date_str)
+                    if pdf_path:
+                        logger.info(f"Found bulletin for {date_str}")
+                        return pdf_path
+        
+        if cached_delta is not None:
+            pdf_path = self.download_pdf(imd_code, dates[cached_delta])
             if pdf_path:
-                logger.info(f"Found bulletin for {date_str}")
+                logger.info(f"Found bulletin for {dates[cached_delta]}")
                 return pdf_path
         
         logger.warning(f"No bulletin found for IMD code {imd_code} in the last {max_days} days")
@@ -183,16 +300,26 @@ class IMDPDFDownloader:
     
     def cleanup_old_files(self, days_to_keep: int = 30):
         """Remove old cached files"""
-        cutoff_date = datetime.now() - timedelta(days=days_to_keep)
+        cutoff_ts = (datetime.now() - timedelta(days=days_to_keep)).timestamp()
         removed_count = 0
         
-        for pdf_file in self.save_dir.glob("*.pdf"):
-            if pdf_file.stat().st_mtime < cutoff_date.timestamp():
-                pdf_file.unlink()
-                removed_count += 1
+        # Single directory pass; also drops stale partial downloads
+        with os.scandir(self.save_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(('.pdf', '.md', '.part')) and entry.stat().st_mtime < cutoff_ts:
+                    os.unlink(entry.path)
+                    removed_count += 1
         
         if removed_count > 0:
             logger.info(f"Cleaned up {removed_count} old cached files")
+    
+    def cleanup_if_due(self, days_to_keep: int = 30, interval_hours: int = 24):
+        """Run cleanup_old_files at most once per interval, tracked by a sentinel file"""
+        sentinel = self.save_dir / ".last_cleanup"
+        if sentinel.exists() and datetime.now().timestamp() - sentinel.stat().st_mtime < interval_hours * 3600:
+            return
+        sentinel.touch()
+        self.cleanup_old_files(days_to_keep)
 
 
 class IMDPDFProcessor:
@@ -204,8 +331,26 @@ class IMDPDFProcessor:
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
     
     def extract_markdown(self) -> str:
-        """Extract content as markdown from PDF"""
+        """Extract content as markdown from PDF, reusing cached extractions"""
+        return _extract_markdown_cached(str(self.pdf_path), self.pdf_path.stat().st_mtime_ns)
+    
+    def _extract_markdown_uncached(self) -> str:
+        """Extract markdown via the on-disk .md cache, running MuPDF only on a miss"""
+        cache_path = self.pdf_path.with_suffix('.md')
+        if cache_path.exists() and cache_path.stat().st_mtime >= self.pdf_path.stat().st_mtime:
+            return cache_path.read_text(encoding='utf-8')
+        
+        markdown_content = self._run_extraction()
         try:
+            cache_path.write_text(markdown_content, encoding='utf-8')
+        except OSError as e:
+            logger.warning(f"Could not cache extracted markdown: {e}")
+        return markdown_content
+    
+    def _run_extraction(self) -> str:
+        """Run pymupdf4llm on the PDF"""
+        try:
+            import pymupdf
             import pymupdf4llm
         except ImportError as e:
             raise RuntimeError(
@@ -215,7 +360,14 @@ class IMDPDFProcessor:
         
         try:
             logger.info(f"Extracting content from: {self.pdf_path}")
-            markdown_content = pymupdf4llm.to_markdown(str(self.pdf_path))
+            # Only the first pages fit in the 3000-char excerpt; reuse the open doc
+            with pymupdf.open(self.pdf_path) as doc:
+                markdown_content = pymupdf4llm.to_markdown(
+                    doc,
+                    pages=list(range(min(MAX_BULLETIN_PAGES, doc.page_count))),
+                    write_images=False,
+                    show_progress=False,
+                )
             
             if not markdown_content.strip():
                 raise ValueError("Extracted content is empty")
@@ -251,6 +403,12 @@ class IMDPDFProcessor:
             raise RuntimeError(f"Failed to extract text from PDF: {e}") from e
 
 
+@lru_cache(maxsize=32)
+def _extract_markdown_cached(pdf_path: str, mtime_ns: int) -> str:
+    """In-memory tier over the .md disk cache; mtime_ns invalidates replaced PDFs"""
+    return IMDPDFProcessor(pdf_path)._extract_markdown_uncached()
+
+
 class WeatherToolManager:
     """Main manager class for weather tool operations"""
     
@@ -258,9 +416,14 @@ class WeatherToolManager:
         self.imd_codes_path = os.getenv("IMD_CODES_FILE", "..\datasets\IMDCodes.csv")
         self.download_dir = os.getenv("WEATHER_DOWNLOAD_DIR", "downloads")
         self.cache_days = int(os.getenv("WEATHER_CACHE_DAYS", "30"))
+        self.bulletin_ttl = int(os.getenv("WEATHER_BULLETIN_TTL", "3600"))
         
         self._handler = None
         self._downloader = None
+        # Successful bulletins keyed by (normalized district, max_days) for bulletin_ttl seconds,
+        # so a bulletin published later in the day is picked up; failures raise and are not cached
+        self._bulletin_cache = TTLCache(maxsize=512, ttl=self.bulletin_ttl)
+        self._bulletin_lock = Lock()
     
     @property
     def handler(self) -> IMDDataHandler:
@@ -279,37 +442,49 @@ class WeatherToolManager:
     def get_weather_bulletin(self, district: str, max_days: int = 7) -> str:
         """Get weather bulletin for a district"""
         try:
-            # Get IMD code for district
-            imd_code = self.handler.get_imd_code(district)
-            logger.info(f"Found IMD code {imd_code} for district '{district}'")
-            
-            # Download latest PDF
-            pdf_path = self.downloader.try_latest_pdf(imd_code, max_days)
-            if not pdf_path:
-                # Provide helpful information about available districts
-                suggestions = self.handler.list_available_districts()[:10]
-                return (
-                    f"No recent IMD bulletin found for district '{district}' "
-                    f"(IMD Code: {imd_code}) in the last {max_days} days.\n\n"
-                    f"Available districts include: {', '.join(suggestions[:5])}..."
-                )
-            
-            # Process PDF and extract content
-            processor = IMDPDFProcessor(pdf_path)
-            content = processor.extract_markdown()
-            
-            # Clean up old files periodically
-            if datetime.now().hour == 0:  # Run cleanup once a day at midnight
-                self.downloader.cleanup_old_files(self.cache_days)
-            
+            key = (district.strip().lower(), max_days)
+            with self._bulletin_lock:
+                content = self._bulletin_cache.get(key)
+            if content is None:
+                content = self._fetch_bulletin(district, max_days)
+                with self._bulletin_lock:
+                    self._bulletin_cache[key] = content
             return content
             
+        except BulletinNotFoundError as e:
+            return str(e)
         except ValueError as e:
             # District not found or similar issues
             return f"District Error: {e}"
         except Exception as e:
             logger.error(f"Weather tool error for district '{district}': {e}")
             return f"Weather Tool Error: Unable to fetch weather bulletin for '{district}'. {e}"
+    
+    def _fetch_bulletin(self, district: str, max_days: int) -> str:
+        """Fetch and extract the bulletin; raises on failure so errors are never cached"""
+        # Get IMD code for district
+        imd_code = self.handler.get_imd_code(district)
+        logger.info(f"Found IMD code {imd_code} for district '{district}'")
+        
+        # Download latest PDF
+        pdf_path = self.downloader.try_latest_pdf(imd_code, max_days)
+        if not pdf_path:
+            # Provide helpful information about available districts
+            suggestions = self.handler.suggestions_sample
+            raise BulletinNotFoundError(
+                f"No recent IMD bulletin found for district '{district}' "
+                f"(IMD Code: {imd_code}) in the last {max_days} days.\n\n"
+                f"Available districts include: {', '.join(suggestions[:5])}..."
+            )
+        
+        # Process PDF and extract content
+        processor = IMDPDFProcessor(pdf_path)
+        content = processor.extract_markdown()
+        
+        # Clean up old files periodically (once a day)
+        self.downloader.cleanup_if_due(self.cache_days)
+        
+        return content
 
 
 # Global manager instance
@@ -1,31 +1,171 @@
+import asyncio
 import requests
 import re
+import time
+from typing import Optional, Tuple
+from threading import Lock
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from langchain.tools import tool
 
-def search_youtube_scrape(query: str) -> str:
-    """
-    Searches YouTube's own search page and returns the first video link.
-    Does NOT use YouTube API.
-    """
+# Linear-time DFA matching when google-re2 is installed; the patterns below are plain
+# literals and character classes, so the stdlib engine is an equivalent fallback.
+try:
+    import re2 as _regex
+except ImportError:
+    _regex = re
+
+# Compiled once at import; matches video IDs inside the results page JSON/script content.
+# Bytes pattern so the page never has to be decoded.
+VIDEO_ID_PATTERN = _regex.compile(rb'/watch\?v=([a-zA-Z0-9_-]{11})')
+# First organic result inside ytInitialData, matched in place instead of json.loads-ing the blob
+VIDEO_RENDERER_PATTERN = _regex.compile(rb'"videoRenderer":\{"videoId":"([a-zA-Z0-9_-]{11})"')
+SCAN_OVERLAP = len(b'"videoRenderer":{"videoId":"') + 12
+# ytInitialData carries the first results near the top of the page
+MAX_SCAN_BYTES = 256 * 1024
+SCAN_CHUNK_BYTES = 64 * 1024
+
+# The results page is several hundred KB of highly compressible HTML. Only advertise
+# br when a Brotli decoder is installed, since both requests and aiohttp need one.
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# Shared session so repeated searches reuse the pooled TLS connection
+_session = requests.Session()
+# Pool sized for the batch tool's concurrent searches; retry transient server errors briefly
+_retry = Retry(
+    total=2,
+    backoff_factor=0.2,
+    status_forcelist=[500, 502, 503, 504],
+    allowed_methods=['GET']
+)
+_session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=_retry))
+
+# Token bucket: bursts of up to 3 requests, then 1 request/sec across all threads
+RATE_LIMIT_BURST = 3.0
+RATE_LIMIT_PER_SEC = 1.0
+_rate_lock = Lock()
+_tokens = RATE_LIMIT_BURST
+_last_refill = time.monotonic()
+
+def _reserve_token() -> float:
+    """Reserve a token under the lock and return how long the caller must wait for it."""
+    global _tokens, _last_refill
+    with _rate_lock:
+        now = time.monotonic()
+        _tokens = min(RATE_LIMIT_BURST, _tokens + (now - _last_refill) * RATE_LIMIT_PER_SEC)
+        _last_refill = now
+        _tokens -= 1.0
+        return -_tokens / RATE_LIMIT_PER_SEC if _tokens < 0 else 0.0
+
+def rate_limit_delay(count: int = 1) -> float:
+    """Seconds until `count` more scrapes would have tokens; reserves nothing, so callers can size deadlines or yield."""
+    with _rate_lock:
+        tokens = min(RATE_LIMIT_BURST, _tokens + (time.monotonic() - _last_refill) * RATE_LIMIT_PER_SEC)
+    return max(0.0, count - tokens) / RATE_LIMIT_PER_SEC
+
+def _wait_for_token() -> None:
+    """Reserve a token, then sleep (outside the lock) until the token is due."""
+    wait = _reserve_token()
+    if wait > 0:
+        time.sleep(wait)
+
+async def _wait_for_token_async() -> None:
+    """Same as _wait_for_token, without blocking the event loop."""
+    wait = _reserve_token()
+    if wait > 0:
+        await asyncio.sleep(wait)
+
+def _search_request(query: str) -> Tuple[str, dict]:
+    """URL and headers for a YouTube results page"""
     search_url = "https://www.youtube.com/results?search_query=" + requests.utils.quote(query)
     headers = {
         "User-Agent": "Mozilla/5.0",
         "Accept-Language": "en-US,en;q=0.9",
+        "Accept-Encoding": ACCEPT_ENCODING,
     }
-    res = requests.get(search_url, headers=headers, timeout=10)
+    return search_url, headers
+
+class _VideoIdScanner:
+    """Incrementally scans the results page for the first search-result video"""
+
+    def __init__(self):
+        self.head = b""
+        self.fallback = None  # first /watch?v= link, used if no videoRenderer shows up
+
+    def feed(self, chunk: bytes) -> Optional[str]:
+        """Append a chunk and return the first videoRenderer link once it appears"""
+        # Rescan only a match-length overlap with the previous data
+        scan_from = max(0, len(self.head) - SCAN_OVERLAP)
+        self.head += chunk
+        match = VIDEO_RENDERER_PATTERN.search(self.head, scan_from)
+        if match:
+            return self._link(match)
+        if self.fallback is None:
+            match = VIDEO_ID_PATTERN.search(self.head, scan_from)
+            if match:
+                self.fallback = self._link(match)
+        return None
+
+    @property
+    def exhausted(self) -> bool:
+        return len(self.head) >= MAX_SCAN_BYTES
+
+    @staticmethod
+    def _link(match) -> str:
+        return "https://www.youtube.com/watch?v=" + match.group(1).decode()
+
+def search_youtube_scrape(query: str) -> str:
+    """
+    Searches YouTube's own search page and returns the first video link.
+    Does NOT use YouTube API.
+    """
+    search_url, headers = _search_request(query)
+    _wait_for_token()
+    with _session.get(search_url, headers=headers, timeout=10, stream=True) as res:
+        if res.status_code != 200:
+            return f"Error fetching results: {res.status_code}"
+
+        # Search each chunk as it arrives and stop at the first search result
+        scanner = _VideoIdScanner()
+        for chunk in res.iter_content(chunk_size=SCAN_CHUNK_BYTES):
+            link = scanner.feed(chunk)
+            if link:
+                return link
+            if scanner.exhausted:
+                break
+
+    return scanner.fallback or "No video found."
+
+async def search_youtube_scrape_async(query: str, session=None) -> str:
+    """
+    Non-blocking variant of search_youtube_scrape. Pass one aiohttp.ClientSession
+    for a batch of queries so they share keep-alive connections.
+    """
+    import aiohttp
+
+    if session is None:
+        async with aiohttp.ClientSession() as own_session:
+            return await search_youtube_scrape_async(query, own_session)
 
-    if res.status_code != 200:
-        return f"Error fetching results: {res.status_code}"
+    search_url, headers = _search_request(query)
+    await _wait_for_token_async()
+    async with session.get(search_url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as res:
+        if res.status != 200:
+            return f"Error fetching results: {res.status}"
 
-    # Look for video IDs inside JSON/script content
-    matches = re.findall(r'\/watch\?v=([a-zA-Z0-9_-]{11})', res.text)
-    if matches:
-        # Deduplicate while preserving order
-        seen = set()
-        unique_ids = [x for x in matches if not (x in seen or seen.add(x))]
-        return "https://www.youtube.com/watch?v=" + unique_ids[0]
+        scanner = _VideoIdScanner()
+        async for chunk in res.content.iter_chunked(SCAN_CHUNK_BYTES):
+            link = scanner.feed(chunk)
+            if link:
+                return link
+            if scanner.exhausted:
+                break
 
-    return "No video found."
+    return scanner.fallback or "No video found."
 
 @tool
 def youtube_search_tool(query: str) -> str:
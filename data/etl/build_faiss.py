@@ -1,21 +1,62 @@
 import json
+import faiss
+import numpy as np
+import torch
 from langchain.vectorstores import FAISS
 from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.docstore.document import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+INDEX_PATH = "kcc_faiss_index"
+# save_local does not persist the distance strategy, so load_vectorstore passes it again
+DISTANCE_STRATEGY = DistanceStrategy.MAX_INNER_PRODUCT
+
+def get_embed_model():
+    # Large normalized batches on GPU when available; normalized vectors allow inner-product search
+    return HuggingFaceEmbeddings(
+        model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+        model_kwargs={'device': 'cuda' if torch.cuda.is_available() else 'cpu'},
+        encode_kwargs={'batch_size': 256, 'normalize_embeddings': True},
+        show_progress=True
+    )
 
 def build_vectorstore(chunk_path):
     with open(chunk_path) as f:
         chunks = json.load(f)
 
-    docs = [
-        Document(page_content=chunk['content'], metadata=chunk['metadata'])
-        for chunk in chunks
-    ]
+    texts = [chunk['content'] for chunk in chunks]
+    metadatas = [chunk['metadata'] for chunk in chunks]
+
+    embed_model = get_embed_model()
+
+    # Embed every text once, then add all vectors to FAISS in bulk
+    vectors = np.asarray(embed_model.embed_documents(texts), dtype=np.float32)
+
+    # HNSW graph index: ~log(N) traversal per query instead of a full flat scan
+    index = faiss.IndexHNSWFlat(vectors.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = 200
+    index.hnsw.efSearch = 64
+    index.add(vectors)
 
-    embed_model = HuggingFaceEmbeddings(model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+    docs = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+    vectorstore = FAISS(
+        embedding_function=embed_model,
+        index=index,
+        docstore=InMemoryDocstore({str(i): doc for i, doc in enumerate(docs)}),
+        index_to_docstore_id={i: str(i) for i in range(len(docs))},
+        distance_strategy=DISTANCE_STRATEGY
+    )
+    vectorstore.save_local(INDEX_PATH)
 
-    vectorstore = FAISS.from_documents(docs, embed_model)
-    vectorstore.save_local("kcc_faiss_index")
+def load_vectorstore(index_path=INDEX_PATH, embed_model=None):
+    """Load the index written by build_vectorstore with the inner-product strategy it was built for"""
+    return FAISS.load_local(
+        index_path,
+        embed_model or get_embed_model(),
+        distance_strategy=DISTANCE_STRATEGY,
+        allow_dangerous_deserialization=True
+    )
 
 if __name__ == "__main__":
     build_vectorstore("chunked.json")
@@ -1,28 +1,32 @@
-from langchain.text_splitter import CharacterTextSplitter
 import json
+import orjson
+
+def split_text(text, chunk_size=500, chunk_overlap=50):
+    # Most QA pairs fit in one chunk; only slice the long ones into overlapping windows
+    if len(text) <= chunk_size:
+        return [text]
+    chunks = []
+    step = chunk_size - chunk_overlap
+    for start in range(0, len(text) - chunk_overlap, step):
+        chunks.append(text[start:start + chunk_size])
+    return chunks
 
 def chunk_qna(json_path):
     with open(json_path) as f:
         data = json.load(f)
 
-    text_splitter = CharacterTextSplitter(
-        separator="\n",
-        chunk_size=500,
-        chunk_overlap=50
-    )
-
     docs = []
     for item in data:
         qa_text = f"Q: {item['question']}\nA: {item['answer']}"
-        chunks = text_splitter.split_text(qa_text)
+        chunks = split_text(qa_text)
         for chunk in chunks:
             docs.append({
                 "content": chunk,
                 "metadata": {"question": item['question']}
             })
 
-    with open("chunked.json", "w") as f:
-        json.dump(docs, f, indent=2)
+    with open("chunked.json", "wb") as f:
+        f.write(orjson.dumps(docs, option=orjson.OPT_INDENT_2))
 
 if __name__ == "__main__":
     chunk_qna("../processed/clean_translated.json")
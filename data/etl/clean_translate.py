@@ -1,7 +1,13 @@
 import pandas as pd
+import torch
 # from transformers import MarianMTModel, MarianTokenizer
 import re
 import json
+import os
+
+# Compiled once; reused by clean_text, clean_series and translate_column
+CLEAN_PATTERN = re.compile(r"[^A-Za-z0-9\s.,?!]")
+DEVANAGARI_PATTERN = re.compile(r"[\u0900-\u097F]")
 
 def load_data(file_path):
     df = pd.read_csv(file_path)
@@ -9,37 +15,62 @@ def load_data(file_path):
     df.dropna(inplace=True)
     return df
 
+def cpu_supports_bf16():
+    # BF16 only pays off with native AVX512-BF16/AMX kernels; elsewhere it is emulated and slower than FP32.
+    # TRANSLATE_CPU_BF16=1/0 overrides the detection.
+    override = os.getenv("TRANSLATE_CPU_BF16")
+    if override is not None:
+        return override.lower() in ("1", "true", "yes")
+    if not torch.backends.mkldnn.is_available():
+        return False
+    checks = [getattr(torch.cpu, name, None) for name in ("_is_avx512_bf16_supported", "_is_amx_tile_supported")]
+    return any(check() for check in checks if check is not None)
+
 # Example: Load MarianMT for Hindi → English
 def load_translator():
+    from transformers import MarianMTModel, MarianTokenizer
     model_name = "Helsinki-NLP/opus-mt-hi-en"
     tokenizer = MarianTokenizer.from_pretrained(model_name)
     model = MarianMTModel.from_pretrained(model_name)
+    # Half-precision weights: FP16 on GPU, BF16 on CPUs with native BF16 support, otherwise FP32
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    if device == "cuda":
+        dtype = torch.float16
+    else:
+        dtype = torch.bfloat16 if cpu_supports_bf16() else torch.float32
+    model = model.to(device=device, dtype=dtype).eval()
     return tokenizer, model
 
 def translate(texts, tokenizer, model):
-    batch = tokenizer.prepare_seq2seq_batch(texts, return_tensors="pt", padding=True)
-    translated = model.generate(**batch)
-    return [tokenizer.decode(t, skip_special_tokens=True) for t in translated]
+    batch = tokenizer(texts, return_tensors="pt", padding=True, truncation=True).to(model.device)
+    with torch.inference_mode():
+        translated = model.generate(**batch, num_beams=1, max_new_tokens=128)
+    return tokenizer.batch_decode(translated, skip_special_tokens=True)
 
 def clean_text(text):
-    return re.sub(r"[^A-Za-z0-9\s.,?!]", "", str(text)).strip()
+    return CLEAN_PATTERN.sub("", str(text)).strip()
+
+def clean_series(series):
+    # Vectorized clean_text over a whole column
+    return series.astype(str).str.replace(CLEAN_PATTERN, "", regex=True).str.strip()
+
+def translate_column(df, column, tokenizer, model, batch_size=64):
+    # Translate only rows detected to be Hindi (simple heuristic), batch_size texts per generate call
+    rows = df.index[df[column].str.contains(DEVANAGARI_PATTERN, na=False)]  # Devanagari script
+    for i in range(0, len(rows), batch_size):
+        batch_rows = rows[i:i + batch_size]
+        df.loc[batch_rows, column] = translate(df.loc[batch_rows, column].tolist(), tokenizer, model)
 
 def run_clean_and_translate(input_csv, output_json):
     df = load_data(input_csv)
     tokenizer, model = load_translator()
 
-    clean_data = []
-    for i, row in df.iterrows():
-        q = clean_text(row['Farmer_Question'])
-        a = clean_text(row['Answer'])
-
-        # Translate if detected to be Hindi (simple heuristic)
-        if re.search(r'[\u0900-\u097F]', q):  # Devanagari script
-            q = translate([q], tokenizer, model)[0]
-        if re.search(r'[\u0900-\u097F]', a):
-            a = translate([a], tokenizer, model)[0]
+    df['question'] = clean_series(df['Farmer_Question'])
+    df['answer'] = clean_series(df['Answer'])
+    translate_column(df, 'question', tokenizer, model)
+    translate_column(df, 'answer', tokenizer, model)
 
-        clean_data.append({"question": q, "answer": a})
+    clean_data = df[['question', 'answer']].to_dict('records')
 
     with open(output_json, "w") as f:
         json.dump(clean_data, f, indent=2)
@@ -1,16 +1,42 @@
-import json
+from concurrent.futures import ThreadPoolExecutor
+import ijson
 from pymongo import MongoClient
 
+BATCH_SIZE = 1000  # keeps each insert_many well under MongoDB's 16MB message limit
+INSERT_WORKERS = 4
+
 def insert_to_mongo(chunk_path, mongo_uri="mongodb://localhost:27017"):
     client = MongoClient(mongo_uri)
     db = client.agri_assistant
     col = db.kcc_data
 
-    with open(chunk_path) as f:
-        data = json.load(f)
-    
-    col.insert_many(data)
-    print("Inserted", len(data), "documents to MongoDB.")
+    # Build the lookup index before loading so it isn't built in the background later
+    col.create_index("metadata.question")
+
+    def insert_batch(docs):
+        col.insert_many(docs, ordered=False, bypass_document_validation=True)
+
+    # Stream the JSON array so memory stays flat regardless of file size;
+    # inserts run on worker threads while the parser keeps reading
+    total = 0
+    pending = []
+    with open(chunk_path, "rb") as f, ThreadPoolExecutor(max_workers=INSERT_WORKERS) as pool:
+        batch = []
+        for doc in ijson.items(f, "item", use_float=True):
+            batch.append(doc)
+            if len(batch) >= BATCH_SIZE:
+                pending.append(pool.submit(insert_batch, batch))
+                total += len(batch)
+                batch = []
+                # Bound in-flight batches so a slow Mongo doesn't buffer the whole file
+                if len(pending) >= INSERT_WORKERS * 2:
+                    pending.pop(0).result()
+        if batch:
+            pending.append(pool.submit(insert_batch, batch))
+            total += len(batch)
+        for future in pending:
+            future.result()
+    print("Inserted", total, "documents to MongoDB.")
 
 if __name__ == "__main__":
     insert_to_mongo("chunked.json")
@@ -4,8 +4,11 @@ from typing import List, Dict, Optional, Tuple
 import logging
 from pathlib import Path
 import json
+import os
 import pickle
 from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 # Translation and NLP imports
 import torch
@@ -13,19 +16,55 @@ from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
 from sentence_transformers import SentenceTransformer
 import faiss
 
+# Shared with backend/tools/rag_tool.py; run from the repo root (python -m data.raw.pipeline)
+from backend.tools.onnx_encoder import load_onnx_int8
+
+# Allow TF32 matmuls on Ampere+ GPUs
+torch.set_float32_matmul_precision("high")
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# int8 ONNX exports of the embedding model for CPU inference (VNNI kernels)
+ONNX_CACHE_DIR = "onnx_models"
+
+# Corpora above this size get an IVF-PQ index instead of exact search
+IVFPQ_MIN_VECTORS = 50_000
+IVF_NPROBE = 16
+ADD_BATCH_SIZE = 65_536
+
+@lru_cache(maxsize=2)
+def _get_embedder(model_name: str) -> SentenceTransformer:
+    """Load each embedding model once per process"""
+    logger.info(f"Loading embedding model: {model_name}")
+    if torch.cuda.is_available():
+        model = SentenceTransformer(model_name)
+        model.half()  # FP16 weights and activations on GPU
+        return model
+    
+    # On CPU prefer an int8 ONNX Runtime export, falling back to PyTorch
+    onnx_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "__"))
+    return load_onnx_int8(model_name, onnx_dir) or SentenceTransformer(model_name)
+
 class IndicTranslator:
     """Handles translation using IndicTrans2 models"""
     
-    def __init__(self, model_path: str = "ai4bharat/indictrans2-indic-en-1B", device: str = None):
+    def __init__(self, model_path: str = "ai4bharat/indictrans2-indic-en-1B", device: str = None,
+                 ct2_model_dir: str = "ct2-indictrans2", num_beams: int = 1):
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
         self.model_path = model_path
+        # Greedy decoding by default; quality-sensitive callers can opt back into beam search
+        self.num_beams = num_beams
+        # Converted once with:
+        #   ct2-transformers-converter --model ai4bharat/indictrans2-indic-en-1B \
+        #       --quantization int8_float16 --output_dir ct2-indictrans2 --trust_remote_code
+        self.ct2_model_dir = ct2_model_dir
         self.tokenizer = None
         self.model = None
+        self.ct2_translator = None
         self.processor = None
+        self._copy_stream = None
         
     def initialize_model(self):
         """Initialize the translation model and tokenizer"""
@@ -34,6 +73,24 @@ class IndicTranslator:
             
             logger.info(f"Loading IndicTrans2 model: {self.model_path}")
             self.tokenizer = AutoTokenizer.from_pretrained(self.model_path, trust_remote_code=True)
+            self.processor = IndicProcessor(inference=True)
+            
+            # Prefer the quantized CTranslate2 model when it has been converted
+            if self.ct2_model_dir and Path(self.ct2_model_dir).is_dir():
+                try:
+                    import ctranslate2
+                    self.ct2_translator = ctranslate2.Translator(
+                        self.ct2_model_dir,
+                        device=self.device,
+                        compute_type="int8_float16" if self.device == "cuda" else "int8",
+                        inter_threads=1,
+                        intra_threads=os.cpu_count() or 1,
+                    )
+                    logger.info(f"Loaded CTranslate2 model from {self.ct2_model_dir}")
+                    return
+                except Exception as e:
+                    logger.warning(f"CTranslate2 unavailable, falling back to transformers: {e}")
+            
             self.model = AutoModelForSeq2SeqLM.from_pretrained(
                 self.model_path,
                 trust_remote_code=True,
@@ -46,65 +103,196 @@ class IndicTranslator:
                 self.model = self.model.to(self.device)
                 
             self.model.eval()
-            self.processor = IndicProcessor(inference=True)
+            self._optimize_model()
+            if self.device == "cuda":
+                self._copy_stream = torch.cuda.Stream()
             logger.info("Model loaded successfully")
             
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             raise
     
+    def _optimize_model(self):
+        """Fuse attention with BetterTransformer and compile the forward pass on GPU, when supported"""
+        try:
+            from optimum.bettertransformer import BetterTransformer
+            self.model = BetterTransformer.transform(self.model, keep_original_model=False)
+            logger.info("Applied BetterTransformer fused attention")
+        except Exception as e:
+            logger.warning(f"BetterTransformer not applied: {e}")
+        
+        if self.device == "cuda":
+            try:
+                # Batch shapes vary with length bucketing, so compile with dynamic shapes
+                # rather than CUDA-graph "reduce-overhead" mode, which re-captures per shape
+                self.model.forward = torch.compile(self.model.forward, dynamic=True, fullgraph=False)
+                logger.info("Compiled translation model forward with torch.compile")
+            except Exception as e:
+                logger.warning(f"torch.compile not applied: {e}")
+    
     def translate_batch(self, texts: List[str], src_lang: str = "hin_Deva", 
-                       tgt_lang: str = "eng_Latn", batch_size: int = 4) -> List[str]:
+                       tgt_lang: str = "eng_Latn", batch_size: int = 32) -> List[str]:
         """Translate a batch of texts"""
-        if not self.model or not self.tokenizer:
+        if not (self.model or self.ct2_translator) or not self.tokenizer:
             self.initialize_model()
+        
+        if not texts:
+            return []
+        
+        # Translate in token-length order so each batch pads to a similar length,
+        # then restore the caller's order
+        lengths = [len(self.tokenizer.tokenize(text)) for text in texts]
+        order = np.argsort(lengths, kind="stable")
+        sorted_texts = [texts[j] for j in order]
+        
+        if self.ct2_translator:
+            sorted_translations = self._translate_batch_ct2(sorted_texts, src_lang, tgt_lang, batch_size)
+        else:
+            sorted_translations = self._translate_batch_hf(sorted_texts, src_lang, tgt_lang, batch_size)
+        
+        translations = [""] * len(texts)
+        for position, translation in zip(order, sorted_translations):
+            translations[position] = translation
+        return translations
+    
+    def _translate_batch_hf(self, texts: List[str], src_lang: str, tgt_lang: str,
+                            batch_size: int) -> List[str]:
+        """Translate with the transformers model, preparing batch i+1 while batch i generates"""
+        translations = []
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        if not batches:
+            return translations
+        
+        # One worker keeps preprocessing order FIFO, which IndicProcessor's placeholder queue relies on
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            next_inputs = prefetcher.submit(self._prepare_hf_inputs, batches[0], src_lang, tgt_lang)
             
+            for i in range(len(batches)):
+                inputs = next_inputs.result()
+                if self._copy_stream is not None:
+                    torch.cuda.current_stream().wait_stream(self._copy_stream)
+                    for tensor in inputs.values():
+                        tensor.record_stream(torch.cuda.current_stream())
+                if i + 1 < len(batches):
+                    next_inputs = prefetcher.submit(self._prepare_hf_inputs, batches[i + 1], src_lang, tgt_lang)
+                
+                # Generate translations
+                with torch.no_grad():
+                    generated_tokens = self.model.generate(
+                        **inputs,
+                        use_cache=True,
+                        min_length=0,
+                        max_length=256,
+                        num_beams=self.num_beams,
+                        do_sample=False,
+                        num_return_sequences=1,
+                        pad_token_id=self.tokenizer.pad_token_id,
+                    )
+                
+                # Decode translations
+                generated_tokens = self.tokenizer.batch_decode(
+                    generated_tokens,
+                    skip_special_tokens=True,
+                    clean_up_tokenization_spaces=True,
+                )
+                
+                # Postprocess
+                batch_translations = self.processor.postprocess_batch(generated_tokens, lang=tgt_lang)
+                translations.extend(batch_translations)
+                
+                # Clear memory
+                del inputs
+        
+        return translations
+    
+    def _prepare_hf_inputs(self, batch: List[str], src_lang: str, tgt_lang: str) -> Dict:
+        """Preprocess and tokenize a batch, copying it to the GPU on a side stream"""
+        # Preprocess the batch
+        batch = self.processor.preprocess_batch(batch, src_lang=src_lang, tgt_lang=tgt_lang)
+        
+        # Tokenize
+        inputs = self.tokenizer(
+            batch,
+            truncation=True,
+            padding="longest",
+            return_tensors="pt",
+            return_attention_mask=True,
+        )
+        
+        if self._copy_stream is None:
+            return dict(inputs.to(self.device))
+        with torch.cuda.stream(self._copy_stream):
+            return {
+                name: tensor.pin_memory().to(self.device, non_blocking=True)
+                for name, tensor in inputs.items()
+            }
+    
+    def _translate_batch_ct2(self, texts: List[str], src_lang: str, tgt_lang: str,
+                             batch_size: int) -> List[str]:
+        """Translate with the CTranslate2 model; CT2 manages its own memory arena"""
         translations = []
         
         for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            
-            # Preprocess the batch
-            batch = self.processor.preprocess_batch(batch, src_lang=src_lang, tgt_lang=tgt_lang)
-            
-            # Tokenize
-            inputs = self.tokenizer(
-                batch,
-                truncation=True,
-                padding="longest",
-                return_tensors="pt",
-                return_attention_mask=True,
-            ).to(self.device)
+            batch = self.processor.preprocess_batch(
+                texts[i:i + batch_size], src_lang=src_lang, tgt_lang=tgt_lang
+            )
             
-            # Generate translations
-            with torch.no_grad():
-                generated_tokens = self.model.generate(
-                    **inputs,
-                    use_cache=False,
-                    min_length=0,
-                    max_length=256,
-                    num_beams=5,
-                    num_return_sequences=1,
+            # CT2 consumes source token strings rather than id tensors
+            source_tokens = [
+                self.tokenizer.convert_ids_to_tokens(
+                    self.tokenizer(text, truncation=True, max_length=256)["input_ids"]
                 )
-            
-            # Decode translations
-            generated_tokens = self.tokenizer.batch_decode(
-                generated_tokens,
-                skip_special_tokens=True,
-                clean_up_tokenization_spaces=True,
+                for text in batch
+            ]
+            results = self.ct2_translator.translate_batch(
+                source_tokens,
+                beam_size=self.num_beams,
+                max_decoding_length=256,
+                batch_type="tokens",
+                max_batch_size=2048,
             )
             
-            # Postprocess
-            batch_translations = self.processor.postprocess_batch(generated_tokens, lang=tgt_lang)
-            translations.extend(batch_translations)
-            
-            # Clear memory
-            del inputs
-            if self.device == "cuda":
-                torch.cuda.empty_cache()
+            decoded = [
+                self.tokenizer.convert_tokens_to_string(result.hypotheses[0])
+                for result in results
+            ]
+            translations.extend(self.processor.postprocess_batch(decoded, lang=tgt_lang))
         
         return translations
 
+class ParquetMetadata:
+    """Read-only, memory-mapped columnar view of the document metadata; rows are built on access"""
+    
+    def __init__(self, path: str):
+        import pyarrow.parquet as pq
+        self.table = pq.read_table(path, memory_map=True)
+        self.columns = dict(zip(self.table.column_names, self.table.columns))
+    
+    @staticmethod
+    def write(metadata: List[Dict], path: str, embedding_model: str):
+        """Write the metadata dicts as one zstd-compressed, dictionary-encoded column per field"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(pd.DataFrame(metadata), preserve_index=False)
+        table = table.replace_schema_metadata({b"embedding_model": embedding_model.encode()})
+        pq.write_table(table, path, compression="zstd", use_dictionary=True)
+    
+    @property
+    def embedding_model(self) -> Optional[str]:
+        schema_metadata = self.table.schema.metadata or {}
+        value = schema_metadata.get(b"embedding_model")
+        return value.decode() if value else None
+    
+    def __len__(self) -> int:
+        return self.table.num_rows
+    
+    def __getitem__(self, i: int) -> Dict:
+        return {name: column[int(i)].as_py() for name, column in self.columns.items()}
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
 class FAISSVectorStore:
     """Handles FAISS vector store operations"""
     
@@ -112,13 +300,15 @@ class FAISSVectorStore:
         self.embedding_model_name = embedding_model
         self.embedding_model = None
         self.index = None
+        self._gpu_resources = None
+        self._on_gpu = False
+        self.embeddings = None
         self.documents = []
         self.metadata = []
         
     def initialize_embeddings(self):
         """Initialize the sentence transformer model"""
-        logger.info(f"Loading embedding model: {self.embedding_model_name}")
-        self.embedding_model = SentenceTransformer(self.embedding_model_name)
+        self.embedding_model = _get_embedder(self.embedding_model_name)
         
     def create_embeddings(self, texts: List[str]) -> np.ndarray:
         """Create embeddings for a list of texts"""
@@ -126,54 +316,129 @@ class FAISSVectorStore:
             self.initialize_embeddings()
             
         logger.info(f"Creating embeddings for {len(texts)} texts")
-        embeddings = self.embedding_model.encode(texts, show_progress_bar=True)
-        return embeddings.astype('float32')
+        # Normalized in the encoder; on GPU the batches stay FP16 on device until the final copy.
+        # Kept as FP16 on the host too; cast to float32 only in slices when handed to FAISS
+        embeddings = self.embedding_model.encode(
+            texts,
+            batch_size=128,
+            show_progress_bar=True,
+            convert_to_tensor=True,
+            normalize_embeddings=True,
+        )
+        return embeddings.half().cpu().numpy()
     
-    def build_index(self, embeddings: np.ndarray):
-        """Build FAISS index from embeddings"""
-        dimension = embeddings.shape[1]
+    def build_index(self, embeddings: np.ndarray, index_type: str = "auto"):
+        """Build FAISS index from L2-normalized embeddings (as returned by create_embeddings)
+        
+        index_type is "flat", "ivfpq", or "auto" (IVF-PQ above IVFPQ_MIN_VECTORS vectors).
+        """
+        num_vectors, dimension = embeddings.shape
         logger.info(f"Building FAISS index with dimension: {dimension}")
         
-        # Use IndexFlatIP for cosine similarity
-        self.index = faiss.IndexFlatIP(dimension)
+        if index_type == "auto":
+            index_type = "ivfpq" if num_vectors > IVFPQ_MIN_VECTORS else "flat"
         
-        # Normalize embeddings for cosine similarity
-        faiss.normalize_L2(embeddings)
-        self.index.add(embeddings)
+        if index_type == "ivfpq":
+            # IVF-PQ: probe nprobe of nlist cells, 16-byte codes per vector
+            nlist = int(4 * np.sqrt(num_vectors))
+            quantizer = faiss.IndexFlatIP(dimension)
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, 16, 8, faiss.METRIC_INNER_PRODUCT)
+            
+            # Train on a sample; 256 points per centroid is plenty for k-means
+            sample_size = min(num_vectors, 256 * nlist)
+            sample_ids = np.sort(np.random.choice(num_vectors, sample_size, replace=False))
+            logger.info(f"Training IVF-PQ index (nlist={nlist}) on {sample_size} vectors")
+            index.train(np.ascontiguousarray(embeddings[sample_ids], dtype='float32'))
+        elif index_type == "flat":
+            # Use IndexFlatIP for cosine similarity; exact search is cheap at this size
+            index = faiss.IndexFlatIP(dimension)
+        else:
+            raise ValueError(f"Unknown index type: {index_type}")
+        
+        # Add in float32 slices so an FP16 (possibly memory-mapped) matrix is never fully upcast
+        for start in range(0, num_vectors, ADD_BATCH_SIZE):
+            index.add(np.ascontiguousarray(embeddings[start:start + ADD_BATCH_SIZE], dtype='float32'))
+        
+        self.index = index
+        self.embeddings = embeddings
+        self._on_gpu = False
+        self._configure_index()
         
         logger.info(f"FAISS index built with {self.index.ntotal} vectors")
     
+    def rebuild_index(self, filepath: str, index_type: str = "auto"):
+        """Rebuild the index from the saved FP16 embeddings without re-running the encoder"""
+        embeddings = np.load(f"{filepath}.embs.npy", mmap_mode='r')
+        logger.info(f"Rebuilding {index_type} FAISS index from {len(embeddings)} stored embeddings")
+        self.build_index(embeddings, index_type=index_type)
+    
+    def _configure_index(self):
+        """Apply search-time parameters and move the index to GPU when one is available"""
+        if isinstance(self.index, faiss.IndexIVF):
+            self.index.nprobe = IVF_NPROBE  # copied over by the GPU cloner
+        
+        if not self._on_gpu and hasattr(faiss, "get_num_gpus") and faiss.get_num_gpus() > 0:
+            try:
+                if faiss.get_num_gpus() > 1:
+                    self.index = faiss.index_cpu_to_all_gpus(self.index)
+                else:
+                    # Keep the resources referenced for the lifetime of the GPU index
+                    self._gpu_resources = faiss.StandardGpuResources()
+                    self.index = faiss.index_cpu_to_gpu(self._gpu_resources, 0, self.index)
+                self._on_gpu = True
+                logger.info(f"FAISS index moved to {faiss.get_num_gpus()} GPU(s)")
+            except Exception as e:
+                logger.warning(f"Could not move FAISS index to GPU, staying on CPU: {e}")
+    
     def search(self, query: str, k: int = 5) -> List[Tuple[float, Dict]]:
         """Search for similar documents"""
+        return self.search_batch([query], k)[0]
+    
+    def search_batch(self, queries: List[str], k: int = 5) -> List[List[Tuple[float, Dict]]]:
+        """Search for several queries with one encode and one index.search call"""
         if not self.index or not self.embedding_model:
             raise ValueError("Index not built or embedding model not initialized")
             
-        # Create query embedding
-        query_embedding = self.embedding_model.encode([query]).astype('float32')
-        faiss.normalize_L2(query_embedding)
-        
-        # Search
-        scores, indices = self.index.search(query_embedding, k)
-        
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < len(self.metadata):
-                results.append((float(score), self.metadata[idx]))
-        
-        return results
+        # Create query embeddings
+        query_embeddings = self.embedding_model.encode(
+            queries, batch_size=64, convert_to_numpy=True, normalize_embeddings=True
+        ).astype('float32')
+        
+        # Search all queries as one matrix so FAISS can parallelize across them
+        scores, indices = self.index.search(query_embeddings, k)
+        
+        batch_results = []
+        for query_scores, query_indices in zip(scores, indices):
+            results = []
+            for score, idx in zip(query_scores, query_indices):
+                if 0 <= idx < len(self.metadata):
+                    results.append((float(score), self.metadata[idx]))
+            batch_results.append(results)
+        
+        return batch_results
     
     def save(self, filepath: str):
         """Save FAISS index and metadata"""
         # Save FAISS index
-        faiss.write_index(self.index, f"{filepath}.index")
+        # GPU indexes have to be copied back to CPU before serialization
+        index = faiss.index_gpu_to_cpu(self.index) if self._on_gpu else self.index
+        faiss.write_index(index, f"{filepath}.index")
         
-        # Save metadata
-        with open(f"{filepath}.metadata", 'wb') as f:
-            pickle.dump({
-                'documents': self.documents,
-                'metadata': self.metadata,
-                'embedding_model': self.embedding_model_name
-            }, f)
+        # Keep the normalized FP16 vectors so the index can be rebuilt without re-embedding
+        if self.embeddings is not None and not isinstance(self.embeddings, np.memmap):
+            np.save(f"{filepath}.embs.npy", self.embeddings)
+        
+        # Save metadata as Parquet; documents are not stored, they derive from the query/answer columns
+        try:
+            ParquetMetadata.write(list(self.metadata), f"{filepath}.parquet", self.embedding_model_name)
+        except Exception as e:
+            logger.warning(f"Could not write Parquet metadata, falling back to pickle: {e}")
+            with open(f"{filepath}.metadata", 'wb') as f:
+                pickle.dump({
+                    'documents': self.documents,
+                    'metadata': list(self.metadata),
+                    'embedding_model': self.embedding_model_name
+                }, f)
         
         logger.info(f"FAISS index and metadata saved to {filepath}")
     
@@ -181,19 +446,41 @@ class FAISSVectorStore:
         """Load FAISS index and metadata"""
         # Load FAISS index
         self.index = faiss.read_index(f"{filepath}.index")
-        
-        # Load metadata
-        with open(f"{filepath}.metadata", 'rb') as f:
-            data = pickle.load(f)
-            self.documents = data['documents']
-            self.metadata = data['metadata']
-            self.embedding_model_name = data['embedding_model']
+        self._on_gpu = False
+        self._configure_index()
+        
+        # Load metadata; prefer the memory-mapped Parquet store, fall back to legacy pickles
+        if Path(f"{filepath}.parquet").exists():
+            self.metadata = ParquetMetadata(f"{filepath}.parquet")
+            self.documents = []
+            self.embedding_model_name = self.metadata.embedding_model or self.embedding_model_name
+        else:
+            with open(f"{filepath}.metadata", 'rb') as f:
+                data = pickle.load(f)
+                self.documents = data['documents']
+                self.metadata = data['metadata']
+                self.embedding_model_name = data['embedding_model']
             
         # Reinitialize embedding model
         self.initialize_embeddings()
         
         logger.info(f"FAISS index and metadata loaded from {filepath}")
 
+# Source CSV column -> processed document key
+METADATA_COLUMNS = {
+    'StateName': 'state',
+    'DistrictName': 'district',
+    'BlockName': 'block',
+    'Sector': 'sector',
+    'Category': 'category',
+    'Crop': 'crop',
+    'QueryType': 'query_type',
+    'Season': 'season',
+    'CreatedOn': 'created_on',
+    'year': 'year',
+    'month': 'month',
+}
+
 class AgriculturalETLPipeline:
     """Main ETL Pipeline for agricultural query data"""
     
@@ -230,10 +517,10 @@ class AgriculturalETLPipeline:
         """Transform the data - clean and translate"""
         logger.info("Starting transformation process")
         
-        # Clean the data
+        # Clean the data (vectorized equivalent of clean_text)
         df_clean = df.copy()
-        df_clean['QueryText'] = df_clean['QueryText'].apply(self.clean_text)
-        df_clean['KccAns'] = df_clean['KccAns'].apply(self.clean_text)
+        for column in ('QueryText', 'KccAns'):
+            df_clean[column] = df_clean[column].fillna('').astype(str).str.split().str.join(' ')
         
         # Remove rows with empty query or answer
         df_clean = df_clean[(df_clean['QueryText'] != "") & (df_clean['KccAns'] != "")]
@@ -244,35 +531,23 @@ class AgriculturalETLPipeline:
         query_texts = df_clean['QueryText'].tolist()
         answer_texts = df_clean['KccAns'].tolist()
         
-        # Translate queries and answers
-        logger.info("Translating queries...")
-        translated_queries = self.translator.translate_batch(query_texts, src_lang="hin_Deva")
-        
-        logger.info("Translating answers...")
-        translated_answers = self.translator.translate_batch(answer_texts, src_lang="hin_Deva")
-        
-        # Create processed documents
-        processed_docs = []
-        for i, row in df_clean.iterrows():
-            doc = {
-                'id': i,
-                'original_query': row['QueryText'],
-                'original_answer': row['KccAns'],
-                'translated_query': translated_queries[i] if i < len(translated_queries) else "",
-                'translated_answer': translated_answers[i] if i < len(translated_answers) else "",
-                'state': row.get('StateName', ''),
-                'district': row.get('DistrictName', ''),
-                'block': row.get('BlockName', ''),
-                'sector': row.get('Sector', ''),
-                'category': row.get('Category', ''),
-                'crop': row.get('Crop', ''),
-                'query_type': row.get('QueryType', ''),
-                'season': row.get('Season', ''),
-                'created_on': row.get('CreatedOn', ''),
-                'year': row.get('year', ''),
-                'month': row.get('month', '')
-            }
-            processed_docs.append(doc)
+        # Translate queries and answers in one pass so length bucketing spans both
+        logger.info("Translating queries and answers...")
+        translations = self.translator.translate_batch(query_texts + answer_texts, src_lang="hin_Deva")
+        translated_queries = translations[:len(query_texts)]
+        translated_answers = translations[len(query_texts):]
+        
+        # Create processed documents; translations are positional, aligned with df_clean rows
+        docs_df = pd.DataFrame({
+            'id': df_clean.index,
+            'original_query': df_clean['QueryText'].to_numpy(),
+            'original_answer': df_clean['KccAns'].to_numpy(),
+            'translated_query': translated_queries,
+            'translated_answer': translated_answers,
+        })
+        for source_column, key in METADATA_COLUMNS.items():
+            docs_df[key] = df_clean[source_column].to_numpy() if source_column in df_clean.columns else ''
+        processed_docs = docs_df.to_dict(orient='records')
         
         logger.info(f"Transformation completed: {len(processed_docs)} documents processed")
         return processed_docs
@@ -339,26 +614,34 @@ class AgriculturalETLPipeline:
     
     def query_system(self, query: str, k: int = 5) -> List[Dict]:
         """Query the built system"""
+        return self.query_system_batch([query], k)[0]
+    
+    def query_system_batch(self, queries: List[str], k: int = 5) -> List[List[Dict]]:
+        """Query the built system with several queries at once"""
         if not self.vector_store.index:
             raise ValueError("Vector store not built. Run pipeline first or load existing index.")
         
-        results = self.vector_store.search(query, k)
-        
-        formatted_results = []
-        for score, metadata in results:
-            formatted_results.append({
-                'score': score,
-                'query': metadata['translated_query'],
-                'answer': metadata['translated_answer'],
-                'original_query': metadata['original_query'],
-                'original_answer': metadata['original_answer'],
-                'location': f"{metadata['district']}, {metadata['state']}",
-                'crop': metadata['crop'],
-                'category': metadata['category'],
-                'query_type': metadata['query_type']
-            })
-        
-        return formatted_results
+        batch_results = self.vector_store.search_batch(queries, k)
+        
+        return [
+            [self._format_result(score, metadata) for score, metadata in results]
+            for results in batch_results
+        ]
+    
+    @staticmethod
+    def _format_result(score: float, metadata: Dict) -> Dict:
+        """Shape a search hit for display"""
+        return {
+            'score': score,
+            'query': metadata['translated_query'],
+            'answer': metadata['translated_answer'],
+            'original_query': metadata['original_query'],
+            'original_answer': metadata['original_answer'],
+            'location': f"{metadata['district']}, {metadata['state']}",
+            'crop': metadata['crop'],
+            'category': metadata['category'],
+            'query_type': metadata['query_type']
+        }
 
 # Usage example and utility functions
 def main():
@@ -375,7 +658,7 @@ def main():
     pipeline = AgriculturalETLPipeline(config)
     
     # Run pipeline
-    result = pipeline.run_pipeline('few.csv', 'agricultural_qa_index')
+    result = pipeline.run_pipeline(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'few.csv'), 'agricultural_qa_index')
     
     print(f"Pipeline result: {result}")
     
@@ -390,9 +673,9 @@ def main():
         ]
         
         print("\nSample Query Results:")
-        for query in sample_queries:
+        all_results = pipeline.query_system_batch(sample_queries, k=3)
+        for query, results in zip(sample_queries, all_results):
             print(f"\nQuery: {query}")
-            results = pipeline.query_system(query, k=3)
             
             for i, result in enumerate(results, 1):
                 print(f"Result {i} (Score: {result['score']:.3f}):")
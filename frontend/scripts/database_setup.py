@@ -2,6 +2,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import asyncio
 from datetime import datetime
 import os
+from argon2 import PasswordHasher
 
 # MongoDB connection
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
@@ -12,44 +13,50 @@ async def setup_database():
     db = client.farmer_agent
     
     try:
-        # Create users collection with indexes
-        await db.users.create_index("email", unique=True)
-        await db.users.create_index("mobile")
-        await db.users.create_index("createdAt")
-        
-        # Create conversations collection with indexes
-        await db.conversations.create_index("id", unique=True)
-        await db.conversations.create_index("userId")
-        await db.conversations.create_index("createdAt")
-        
-        # Create sample data for testing
-        sample_user = {
-            "email": "farmer@example.com",
-            "mobile": "+919876543210",
-            "password": "password123",  # In production, this should be hashed
-            "name": "Ravi Kumar",
-            "age": 35,
-            "state": "Karnataka",
-            "district": "Bangalore Rural",
-            "isOnboarded": True,
-            "createdAt": datetime.utcnow()
-        }
-        
-        # Insert sample user if not exists
-        existing_user = await db.users.find_one({"email": sample_user["email"]})
-        if not existing_user:
-            await db.users.insert_one(sample_user)
-            print("Sample user created successfully")
+        # Indexes are independent round-trips, so issue them concurrently
+        # alongside the sample-user check
+        await asyncio.gather(
+            # Create users collection with indexes
+            db.users.create_index("email", unique=True),
+            db.users.create_index("mobile"),
+            db.users.create_index("createdAt"),
+            # Create conversations collection with indexes
+            db.conversations.create_index("id", unique=True),
+            # Serves the per-user, newest-first conversation list straight from the index
+            db.conversations.create_index([("userId", 1), ("createdAt", -1)]),
+            ensure_sample_user(db),
+        )
         
         print("Database setup completed successfully!")
         print("Collections created:")
         print("- users (with email, mobile, createdAt indexes)")
-        print("- conversations (with id, userId, createdAt indexes)")
+        print("- conversations (with id and (userId, createdAt) indexes)")
         
     except Exception as e:
         print(f"Error setting up database: {e}")
     finally:
         client.close()
 
+async def ensure_sample_user(db):
+    """Insert the sample user for testing if it does not exist yet"""
+    # Create sample data for testing
+    sample_user = {
+        "email": "farmer@example.com",
+        "mobile": "+919876543210",
+        "password": PasswordHasher().hash("password123"),
+        "name": "Ravi Kumar",
+        "age": 35,
+        "state": "Karnataka",
+        "district": "Bangalore Rural",
+        "isOnboarded": True,
+        "createdAt": datetime.utcnow()
+    }
+    
+    # Insert sample user if not exists
+    existing_user = await db.users.find_one({"email": sample_user["email"]})
+    if not existing_user:
+        await db.users.insert_one(sample_user)
+        print("Sample user created successfully")
+
 if __name__ == "__main__":
     asyncio.run(setup_database())
@@ -1,14 +1,21 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 import uvicorn
 from datetime import datetime
 import os
+import hmac
+import asyncio
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from cachetools import TTLCache
 from motor.motor_asyncio import AsyncIOMotorClient
 import google.generativeai as genai
 from bson import ObjectId
 import json
+import logging
 
 # Initialize FastAPI app
 app = FastAPI(title="Farmer Agent API", version="1.0.0")
@@ -31,6 +38,11 @@ db = client.farmer_agent
 genai.configure(api_key=os.getenv("GEMINI_API_KEY", "your-gemini-api-key"))
 model = genai.GenerativeModel('gemini-pro')
 
+# Argon2id password hashing
+password_hasher = PasswordHasher()
+
+logger = logging.getLogger(__name__)
+
 # Pydantic models
 class UserRegistration(BaseModel):
     email: str
@@ -66,6 +78,47 @@ class Conversation(BaseModel):
     messages: List[Message]
     createdAt: datetime
 
+# Short-lived, bounded cache of user profiles used to build chat context
+USER_CONTEXT_TTL_SECONDS = 300
+USER_CONTEXT_CACHE_SIZE = 4096
+_user_context_cache = TTLCache(maxsize=USER_CONTEXT_CACHE_SIZE, ttl=USER_CONTEXT_TTL_SECONDS)
+
+async def get_user_context(user_id: str):
+    """Fetch the user profile for chat context, cached per user for a few minutes"""
+    cached = _user_context_cache.get(user_id)
+    if cached:
+        return cached
+    
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, projection={"password": 0})
+    if user:
+        _user_context_cache[user_id] = user
+    return user
+
+async def verify_user_password(user, password: str) -> bool:
+    """Check a login password against the stored hash, upgrading legacy plaintext entries.
+
+    Argon2 is deliberately slow, so hashing and verification run off the event loop.
+    """
+    stored = user.get("password") or ""
+    if not stored.startswith("$argon2"):
+        # Accounts created before hashing: compare in constant time, then store a hash
+        if not hmac.compare_digest(stored.encode(), password.encode()):
+            return False
+        needs_rehash = True
+    else:
+        try:
+            await asyncio.to_thread(password_hasher.verify, stored, password)
+        except (VerificationError, InvalidHashError):
+            return False
+        needs_rehash = password_hasher.check_needs_rehash(stored)
+    
+    if needs_rehash:
+        await db.users.update_one(
+            {"_id": user["_id"]},
+            {"$set": {"password": await asyncio.to_thread(password_hasher.hash, password)}}
+        )
+    return True
+
 # Helper function to convert ObjectId to string
 def serialize_doc(doc):
     if doc:
@@ -85,7 +138,7 @@ async def register_user(user_data: UserRegistration):
         user_doc = {
             "email": user_data.email,
             "mobile": user_data.mobile,
-            "password": user_data.password,  # In production, hash this password
+            "password": await asyncio.to_thread(password_hasher.hash, user_data.password),
             "name": "",
             "age": None,
             "state": "",
@@ -106,13 +159,10 @@ async def register_user(user_data: UserRegistration):
 @app.post("/api/auth/login")
 async def login_user(login_data: UserLogin):
     try:
-        # Find user by email and password
-        user = await db.users.find_one({
-            "email": login_data.email,
-            "password": login_data.password  # In production, verify hashed password
-        })
+        # Point lookup on the unique email index, then verify the hash
+        user = await db.users.find_one({"email": login_data.email})
         
-        if not user:
+        if not user or not await verify_user_password(user, login_data.password):
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
         user["id"] = str(user["_id"])
@@ -142,21 +192,23 @@ async def update_user_profile(user_id: str, profile_data: UserProfile):
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
         
+        _user_context_cache.pop(user_id, None)
         return {"message": "Profile updated successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Chat endpoints
-@app.post("/api/chat")
-async def chat_with_ai(chat_data: ChatMessage):
-    try:
-        # Get user context
-        user = await db.users.find_one({"_id": ObjectId(chat_data.userId)})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Create context for the AI
-        context = f"""
+# Fallback responses if AI fails
+FALLBACK_RESPONSES = {
+    "en": "I understand your farming question. For the best advice, I recommend consulting with local agricultural experts who can provide specific guidance for your region.",
+    "hi": "मैं आपके खेती के सवाल को समझता हूं। सबसे अच्छी सलाह के लिए, मैं स्थानीय कृषि विशेषज्ञों से सलाह लेने की सिफारिश करता हूं।",
+    "kn": "ನಾನು ನಿಮ್ಮ ಕೃಷಿ ಪ್ರಶ್ನೆಯನ್ನು ಅರ್ಥಮಾಡಿಕೊಂಡಿದ್ದೇನೆ. ಉತ್ತಮ ಸಲಹೆಗಾಗಿ, ಸ್ಥಳೀಯ ಕೃಷಿ ತಜ್ಞರೊಂದಿಗೆ ಸಮಾಲೋಚಿಸಲು ನಾನು ಶಿಫಾರಸು ಮಾಡುತ್ತೇನೆ.",
+    "mr": "मला तुमचा शेतीचा प्रश्न समजला आहे. सर्वोत्तम सल्ल्यासाठी, मी स्थानिक कृषी तज्ञांशी सल्लामसलत करण्याची शिफारस करतो."
+}
+
+def build_chat_context(user, chat_data: ChatMessage) -> str:
+    """Create context for the AI"""
+    return f"""
         You are an AI assistant helping farmers with agricultural questions.
         User details:
         - Name: {user.get('name', 'Farmer')}
@@ -168,63 +220,114 @@ async def chat_with_ai(chat_data: ChatMessage):
         
         User question: {chat_data.message}
         """
+
+async def save_chat_turn(conversation_id: str, chat_data: ChatMessage, ai_response: str):
+    """Append this turn; conversation fields are only written when it is created"""
+    new_messages = [
+        {
+            "id": str(ObjectId()),
+            "text": chat_data.message,
+            "isUser": True,
+            "timestamp": datetime.utcnow()
+        },
+        {
+            "id": str(ObjectId()),
+            "text": ai_response,
+            "isUser": False,
+            "timestamp": datetime.utcnow()
+        }
+    ]
+    
+    # Upsert conversation
+    await db.conversations.update_one(
+        {"id": conversation_id},
+        {
+            "$setOnInsert": {
+                "userId": chat_data.userId,
+                "title": chat_data.message[:50] + ("..." if len(chat_data.message) > 50 else ""),
+                "createdAt": datetime.utcnow()
+            },
+            "$push": {"messages": {"$each": new_messages}}
+        },
+        upsert=True
+    )
+
+@app.post("/api/chat")
+async def chat_with_ai(chat_data: ChatMessage):
+    try:
+        # Get user context
+        user = await get_user_context(chat_data.userId)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        context = build_chat_context(user, chat_data)
         
         # Generate response using Gemini
         try:
             response = model.generate_content(context)
             ai_response = response.text
         except Exception as ai_error:
-            # Fallback responses if AI fails
-            fallback_responses = {
-                "en": "I understand your farming question. For the best advice, I recommend consulting with local agricultural experts who can provide specific guidance for your region.",
-                "hi": "मैं आपके खेती के सवाल को समझता हूं। सबसे अच्छी सलाह के लिए, मैं स्थानीय कृषि विशेषज्ञों से सलाह लेने की सिफारिश करता हूं।",
-                "kn": "ನಾನು ನಿಮ್ಮ ಕೃಷಿ ಪ್ರಶ್ನೆಯನ್ನು ಅರ್ಥಮಾಡಿಕೊಂಡಿದ್ದೇನೆ. ಉತ್ತಮ ಸಲಹೆಗಾಗಿ, ಸ್ಥಳೀಯ ಕೃಷಿ ತಜ್ಞರೊಂದಿಗೆ ಸಮಾಲೋಚಿಸಲು ನಾನು ಶಿಫಾರಸು ಮಾಡುತ್ತೇನೆ.",
-                "mr": "मला तुमचा शेतीचा प्रश्न समजला आहे. सर्वोत्तम सल्ल्यासाठी, मी स्थानिक कृषी तज्ञांशी सल्लामसलत करण्याची शिफारस करतो."
-            }
-            ai_response = fallback_responses.get(chat_data.language, fallback_responses["en"])
+            ai_response = FALLBACK_RESPONSES.get(chat_data.language, FALLBACK_RESPONSES["en"])
         
         # Save conversation to database
         conversation_id = chat_data.conversationId or str(ObjectId())
-        
-        # Create or update conversation
-        conversation_doc = {
-            "id": conversation_id,
-            "userId": chat_data.userId,
-            "title": chat_data.message[:50] + ("..." if len(chat_data.message) > 50 else ""),
-            "messages": [
-                {
-                    "id": str(ObjectId()),
-                    "text": chat_data.message,
-                    "isUser": True,
-                    "timestamp": datetime.utcnow()
-                },
-                {
-                    "id": str(ObjectId()),
-                    "text": ai_response,
-                    "isUser": False,
-                    "timestamp": datetime.utcnow()
-                }
-            ],
-            "createdAt": datetime.utcnow()
-        }
-        
-        # Upsert conversation
-        await db.conversations.update_one(
-            {"id": conversation_id},
-            {"$set": conversation_doc},
-            upsert=True
-        )
+        await save_chat_turn(conversation_id, chat_data, ai_response)
         
         return {"response": ai_response, "conversationId": conversation_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/chat/stream")
+async def stream_chat_with_ai(chat_data: ChatMessage):
+    """Same as /api/chat, but streams the answer as server-sent events while Gemini generates it"""
+    user = await get_user_context(chat_data.userId)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    context = build_chat_context(user, chat_data)
+    conversation_id = chat_data.conversationId or str(ObjectId())
+    
+    async def event_stream():
+        chunks = []
+        error = None
+        try:
+            response = await model.generate_content_async(context, stream=True)
+            async for chunk in response:
+                chunks.append(chunk.text)
+                yield f"data: {json.dumps({'delta': chunk.text})}\n\n"
+        except Exception as ai_error:
+            if chunks:
+                # Part of the answer was already sent; tell the client it was cut short
+                logger.error(f"Chat stream for conversation {conversation_id} failed mid-response: {ai_error}")
+                error = "The response was interrupted before it finished."
+            else:
+                fallback = FALLBACK_RESPONSES.get(chat_data.language, FALLBACK_RESPONSES["en"])
+                chunks.append(fallback)
+                yield f"data: {json.dumps({'delta': fallback})}\n\n"
+        
+        # Persist once, with the accumulated answer, at end of stream
+        try:
+            await save_chat_turn(conversation_id, chat_data, "".join(chunks))
+        except Exception as e:
+            logger.error(f"Failed to save chat turn for conversation {conversation_id}: {e}")
+            error = error or "The conversation could not be saved."
+        
+        # Always end with a terminal event; errors carry done too so clients can finish either way
+        final = {'done': True, 'conversationId': conversation_id}
+        if error:
+            final['error'] = error
+        yield f"data: {json.dumps(final)}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.get("/api/conversations/{user_id}")
 async def get_user_conversations(user_id: str):
     try:
+        # List view only: message bodies are served by get_conversation_messages
         conversations = await db.conversations.find(
-            {"userId": user_id}
-        ).sort("createdAt", -1).to_list(length=50)
+            {"userId": user_id},
+            projection={"messages": 0}
+        ).sort("createdAt", -1).limit(50).to_list(length=50)
         
         return [serialize_doc(conv) for conv in conversations]
     except Exception as e:
@@ -1,38 +1,226 @@
-from langchain.agents import initialize_agent, Tool
 from langchain_google_genai import ChatGoogleGenerativeAI
-from tool_wrapper import youtube_search_tool
+from backend.tools.youtube_search_tool import RATE_LIMIT_BURST, rate_limit_delay
+from youtube.tool_wrapper import (
+    SEARCH_TIMEOUT_MESSAGE,
+    SEARCH_TIMEOUT_SECONDS,
+    cached_search_async,
+    search_with_timeout,
+    speculate,
+    warm_cache,
+)
 from dotenv import load_dotenv  # ✅ import from python-dotenv
+from pydantic import BaseModel, Field
 import os
+import asyncio
+import logging
+from threading import Lock, Thread
 
 # Load all variables from the .env file into environment variables
 load_dotenv()
 
-# Get API key
-google_api_key = os.getenv("GOOGLE_API_KEY")
-if not google_api_key:
-    raise ValueError("GOOGLE_API_KEY not found in environment variables.")
-
-# Gemini 2.0 Flash LLM
-llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash", temperature=0)
-
-# Define tools for the agent
-tools = [
-    Tool(
-        name="YouTubeSearch",
-        func=youtube_search_tool,
-        description="Search YouTube and return the first matching video link"
-    )
-]
+# Run LangChain callback/tracing handlers in the background instead of blocking each step on them,
+# and only log verbosely when debugging
+os.environ.setdefault("LANGCHAIN_CALLBACKS_BACKGROUND", "true")
+DEBUG = os.getenv("DEBUG", "").lower() in ("1", "true", "yes")
+
+# Model and token budget for the two LLM roles: a small, fast model for query
+# extraction, and the larger one only for user-facing text
+QUERY_MODEL = "gemini-2.0-flash-lite"
+# Room for the structured-output (function-call JSON) framing around the query, not just the query
+QUERY_MAX_OUTPUT_TOKENS = 64
+RESPONSE_MODEL = "gemini-2.0-flash"
+RESPONSE_MAX_OUTPUT_TOKENS = 128
+
+logger = logging.getLogger(__name__)
+
+_llm_lock = Lock()
+_llms = {}
 
-# Initialize the agent
-agent = initialize_agent(
-    tools,
-    llm,
-    agent="zero-shot-react-description",
-    verbose=True
+def get_llm(model: str, max_output_tokens: int) -> ChatGoogleGenerativeAI:
+    """Process-wide Gemini client per (model, token budget), built on first use and reused by every call"""
+    key = (model, max_output_tokens)
+    llm = _llms.get(key)
+    if llm is None:
+        with _llm_lock:
+            llm = _llms.get(key)
+            if llm is None:
+                # Get API key
+                google_api_key = os.getenv("GOOGLE_API_KEY")
+                if not google_api_key:
+                    raise ValueError("GOOGLE_API_KEY not found in environment variables.")
+                llm = ChatGoogleGenerativeAI(
+                    model=model,
+                    temperature=0,
+                    max_output_tokens=max_output_tokens,
+                    google_api_key=google_api_key,
+                    verbose=DEBUG,
+                )
+                _llms[key] = llm
+    return llm
+
+VIDEO_LINK_PLACEHOLDER = "{video_link}"
+RESPONSE_TEMPLATE_PROMPT = (
+    "Write one or two friendly sentences recommending a YouTube video for this request. "
+    f"Put the literal placeholder {VIDEO_LINK_PLACEHOLDER} where the link goes.\n\nRequest: "
 )
 
+class QuerySchema(BaseModel):
+    """Arguments for youtube_search_tool"""
+    query: str = Field(description="Short YouTube search query for the request")
+
+QUERY_EXTRACTION_PROMPT = "Extract the YouTube search query from this request.\n\nRequest: "
+
+def _query_extractor():
+    return get_llm(QUERY_MODEL, QUERY_MAX_OUTPUT_TOKENS).with_structured_output(QuerySchema)
+
+def _query_or_prompt(result: QuerySchema, prompt: str) -> str:
+    if result and result.query.strip():
+        return result.query.strip()
+    logger.warning("Query extraction returned no query, searching with the raw prompt")
+    return prompt
+
+def extract_search_query(prompt: str) -> str:
+    """One short structured-output LLM call instead of a ReAct Thought/Action/Observation loop"""
+    # Turns a free-form request into youtube_search_tool's arguments; falls back to the raw prompt
+    try:
+        return _query_or_prompt(_query_extractor().invoke(QUERY_EXTRACTION_PROMPT + prompt), prompt)
+    except Exception as e:
+        logger.warning(f"Query extraction failed, searching with the raw prompt: {e}")
+        return prompt
+
+async def extract_search_query_async(prompt: str) -> str:
+    """Non-blocking extract_search_query"""
+    try:
+        return _query_or_prompt(await _query_extractor().ainvoke(QUERY_EXTRACTION_PROMPT + prompt), prompt)
+    except Exception as e:
+        logger.warning(f"Query extraction failed, searching with the raw prompt: {e}")
+        return prompt
+
+def run(prompt: str) -> str:
+    """There is exactly one tool, so dispatch to it directly once its query is extracted"""
+    return search_with_timeout(extract_search_query(prompt))
+
+async def _search_for(prompt: str) -> str:
+    return await asyncio.to_thread(search_with_timeout, await extract_search_query_async(prompt))
+
+async def _speculate_for(prompt: str):
+    return await asyncio.to_thread(speculate, await extract_search_query_async(prompt))
+
+def fill_template(template: str, link: str) -> str:
+    """Substitute the scraped link into the LLM-written reply"""
+    if not link.startswith("https://"):
+        return link  # no video: report the tool result as-is
+    if VIDEO_LINK_PLACEHOLDER not in template:
+        template = f"{template.rstrip()}\n{VIDEO_LINK_PLACEHOLDER}"
+    return template.replace(VIDEO_LINK_PLACEHOLDER, link)
+
+async def answer_async(prompt: str) -> str:
+    """Search (query extraction + scrape) and write the reply concurrently, then join them: the search hides behind LLM decoding"""
+    scrape = asyncio.create_task(_search_for(prompt))
+    template, link = await asyncio.gather(get_llm(RESPONSE_MODEL, RESPONSE_MAX_OUTPUT_TOKENS).ainvoke(RESPONSE_TEMPLATE_PROMPT + prompt), scrape)
+    return fill_template(template.content, link)
+
+async def stream_answer(prompt: str):
+    """Like answer_async, but yields the reply as it decodes; the link is awaited only when reached.
+
+    If the search is still running at that point, a cached best guess is sent instead and
+    corrected at the end of the reply when the real result differs.
+    """
+    speculation = asyncio.create_task(_speculate_for(prompt))
+
+    async def search() -> str:
+        _, pending = await speculation
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(pending), SEARCH_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            return SEARCH_TIMEOUT_MESSAGE
+
+    scrape = asyncio.create_task(search())
+    buffer = ""
+    link_sent = False
+    speculative_link = None
+
+    async def resolve_link() -> str:
+        link = await scrape
+        return link if link.startswith("https://") else f"({link})"
+
+    async for chunk in get_llm(RESPONSE_MODEL, RESPONSE_MAX_OUTPUT_TOKENS).astream(RESPONSE_TEMPLATE_PROMPT + prompt):
+        buffer += chunk.content
+        if not link_sent and VIDEO_LINK_PLACEHOLDER in buffer:
+            before, buffer = buffer.split(VIDEO_LINK_PLACEHOLDER, 1)
+            yield before
+            guess = None if scrape.done() else (await speculation)[0]
+            if guess:
+                speculative_link = guess
+                yield guess
+            else:
+                yield await resolve_link()
+            link_sent = True
+        # Hold back a tail that could be the start of the placeholder
+        keep = 0 if link_sent else len(VIDEO_LINK_PLACEHOLDER) - 1
+        if len(buffer) > keep:
+            yield buffer[:len(buffer) - keep]
+            buffer = buffer[len(buffer) - keep:]
+
+    yield buffer
+    if not link_sent:
+        yield "\n" + await resolve_link()
+    elif speculative_link:
+        link = await scrape
+        if link.startswith("https://") and link != speculative_link:
+            yield f"\nUpdated link: {link}"
+
+# Scrapes in flight at once. The shared token bucket admits RATE_LIMIT_BURST scrapes immediately
+# and then one per second, so extra concurrency would only queue on tokens.
+MAX_CONCURRENT_SEARCHES = int(RATE_LIMIT_BURST)
+
+async def run_batch_async(queries: list[str]) -> list[str]:
+    """Run independent searches concurrently, paced by the scrape rate limiter; results keep the order of queries"""
+    import aiohttp
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
+
+    # One session for the whole batch so requests share keep-alive connections
+    async with aiohttp.ClientSession() as session:
+        async def run_one(query: str) -> str:
+            async with semaphore:
+                # At most MAX_CONCURRENT_SEARCHES scrapes wait on tokens, so that bounds this one's
+                # rate-limit wait; keep it out of the search deadline
+                timeout = SEARCH_TIMEOUT_SECONDS + rate_limit_delay(MAX_CONCURRENT_SEARCHES)
+                return await cached_search_async(query, session, timeout)
+
+        return await asyncio.gather(*(run_one(query) for query in queries))
+
+def run_batch(queries: list[str]) -> list[str]:
+    """Synchronous wrapper around run_batch_async"""
+    return asyncio.run(run_batch_async(queries))
+
+# A handful of advisory queries dominate traffic; warming them makes their first request a cache hit
+POPULAR_QUERIES = [
+    "general farming tips",
+    "irrigation basics",
+    "organic farming methods",
+    "crop rotation techniques",
+    "drip irrigation setup",
+    "soil testing at home",
+    "pest control for vegetables",
+    "how to make compost",
+]
+
+def start_cache_warmup(queries: list[str] = POPULAR_QUERIES) -> Thread:
+    """Fill the search caches with POPULAR_QUERIES on a daemon thread; does not block startup or user searches"""
+    thread = Thread(target=warm_cache, args=(queries,), name="youtube-cache-warmup", daemon=True)
+    thread.start()
+    return thread
+
 if __name__ == "__main__":
+    start_cache_warmup()
     query = "General farming tips which is around 30 minutes"
-    result = agent.run(f"Find me a YouTube link for '{query}'")
-    print("Agent Result:", result)
+
+    async def main():
+        print("Agent Result: ", end="", flush=True)
+        async for piece in stream_answer(query):
+            print(piece, end="", flush=True)
+        print()
+
+    asyncio.run(main())
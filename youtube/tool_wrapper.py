@@ -1,10 +1,270 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, wait
+from functools import lru_cache
+from threading import Lock
+from typing import Optional, Tuple
+
+import numpy as np
 from langchain.tools import tool
-from search_youtube import search_youtube_scrape
+
+logger = logging.getLogger(__name__)
+
+# Reuse the backend implementation instead of keeping a second scraper copy.
+# Imported by package path, so run from the repo root (python -m youtube.test_agent)
+from backend.tools.youtube_search_tool import (
+    RATE_LIMIT_BURST,
+    rate_limit_delay,
+    search_youtube_scrape,
+    search_youtube_scrape_async,
+)
+
+# Semantic cache: near-duplicate queries ("farming tips 30 min" / "30 minute farming tips")
+# reuse the earlier result instead of scraping again
+SEMANTIC_CACHE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("YOUTUBE_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_SIZE = 1024
+
+# Per-tool deadline so a slow YouTube response cannot stall the agent chain
+SEARCH_TIMEOUT_SECONDS = float(os.getenv("YOUTUBE_SEARCH_TIMEOUT", "5.0"))
+SEARCH_TIMEOUT_MESSAGE = "YouTube search timed out. Please try again."
+
+# Looser similarity for speculative answers: shown immediately, then corrected if the real search differs
+SPECULATION_THRESHOLD = float(os.getenv("YOUTUBE_SPECULATION_THRESHOLD", "0.8"))
+
+# Persistent tier shared across restarts and workers: memory (off), disk (diskcache) or redis.
+# A query's top result is stable for hours, so links are kept for PERSISTENT_CACHE_TTL seconds
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+PERSISTENT_CACHE_TTL = int(os.getenv("YOUTUBE_CACHE_TTL", "3600"))
+DISK_CACHE_DIR = os.path.expanduser(os.getenv("YOUTUBE_DISK_CACHE_DIR", "~/.agrimitra_cache"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+_embedder = None
+_embedder_lock = Lock()
+_cache_lock = Lock()
+_cache_embeddings = []
+_cache_results = []
+_persistent_cache = None
+_persistent_opened = False
+_persistent_error_logged = False
+_persistent_lock = Lock()
+# Bounded pool: abandoned (timed-out) scrapes finish in the background and still fill the caches
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="youtube-search")
+
+def _embed(query: str) -> np.ndarray:
+    """Unit-length query embedding, loading the encoder on first use"""
+    global _embedder
+    if _embedder is None:
+        # Warm-up, the search pool and to_thread callers all arrive at startup; load the model once
+        with _embedder_lock:
+            if _embedder is None:
+                from sentence_transformers import SentenceTransformer
+                _embedder = SentenceTransformer(SEMANTIC_CACHE_MODEL)
+    return _embedder.encode(query, normalize_embeddings=True, convert_to_numpy=True)
+
+class _SearchMiss(Exception):
+    """Carries a non-link result out of the exact cache so lru_cache does not store it"""
+
+def _get_persistent_cache():
+    """diskcache.Cache or redis.Redis for CACHE_BACKEND, opened on first use; None for memory"""
+    global _persistent_cache, _persistent_opened
+    if not _persistent_opened:
+        with _persistent_lock:
+            if not _persistent_opened:
+                _persistent_cache = _open_persistent_cache()
+                _persistent_opened = True
+    return _persistent_cache
+
+def _open_persistent_cache():
+    if CACHE_BACKEND == "memory":
+        return None
+    try:
+        if CACHE_BACKEND == "disk":
+            import diskcache
+            return diskcache.Cache(DISK_CACHE_DIR)
+        if CACHE_BACKEND == "redis":
+            import redis
+            return redis.Redis.from_url(REDIS_URL)
+    except ImportError as e:
+        logger.warning(f"CACHE_BACKEND={CACHE_BACKEND} needs {e.name}, which is not installed; using the in-memory caches only")
+        return None
+    raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+
+def _persistent_key(normalized_query: str) -> str:
+    return f"agrimitra:youtube:{normalized_query}"
+
+def _persistent_failed(e: Exception):
+    # The persistent tier is optional: an outage degrades to the in-memory caches, logged once
+    global _persistent_error_logged
+    if not _persistent_error_logged:
+        _persistent_error_logged = True
+        logger.warning(f"CACHE_BACKEND={CACHE_BACKEND} unavailable, using the in-memory caches: {e}")
+
+def _persistent_get(normalized_query: str):
+    cache = _get_persistent_cache()
+    if cache is None:
+        return None
+    try:
+        value = cache.get(_persistent_key(normalized_query))
+    except Exception as e:  # redis.RedisError, diskcache/sqlite OSError, ...
+        _persistent_failed(e)
+        return None
+    return value.decode() if isinstance(value, bytes) else value
+
+def _persistent_set(normalized_query: str, link: str):
+    cache = _get_persistent_cache()
+    if cache is None:
+        return
+    try:
+        if CACHE_BACKEND == "redis":
+            cache.setex(_persistent_key(normalized_query), PERSISTENT_CACHE_TTL, link)
+        else:
+            cache.set(_persistent_key(normalized_query), link, expire=PERSISTENT_CACHE_TTL)
+    except Exception as e:
+        _persistent_failed(e)
+
+def cached_search(query: str) -> str:
+    """search_youtube_scrape behind an exact-match LRU, the persistent tier, then a semantic cache"""
+    try:
+        return _exact_search(query.strip().lower())
+    except _SearchMiss as miss:
+        return str(miss)
+
+@lru_cache(maxsize=1024)
+def _exact_search(normalized_query: str) -> str:
+    """O(1) hit for repeated identical queries; only links are cached"""
+    cached = _persistent_get(normalized_query)
+    if cached:
+        return cached
+
+    result = _semantic_search(normalized_query)
+    if not result.startswith("https://"):
+        raise _SearchMiss(result)
+    return result
+
+def _semantic_lookup(embedding: np.ndarray, threshold: float = SEMANTIC_CACHE_THRESHOLD):
+    """Cached link for the most similar earlier query, if it is similar enough"""
+    with _cache_lock:
+        if _cache_embeddings:
+            similarities = np.stack(_cache_embeddings) @ embedding
+            best = int(similarities.argmax())
+            if similarities[best] >= threshold:
+                return _cache_results[best]
+    return None
+
+def _semantic_store(embedding: np.ndarray, result: str):
+    # Only cache real links; errors and misses should be retried
+    if result.startswith("https://"):
+        with _cache_lock:
+            _cache_embeddings.append(embedding)
+            _cache_results.append(result)
+            if len(_cache_embeddings) > SEMANTIC_CACHE_SIZE:
+                del _cache_embeddings[0], _cache_results[0]
+
+def _semantic_search(query: str) -> str:
+    """search_youtube_scrape behind a cosine-similarity cache of previous queries"""
+    embedding = _embed(query)
+    cached = _semantic_lookup(embedding)
+    if cached:
+        return cached
+
+    result = search_youtube_scrape(query)
+    _semantic_store(embedding, result)
+    # Persist only scraped links, never a semantic near-match, under this exact query
+    if result.startswith("https://"):
+        _persistent_set(query, result)
+    return result
+
+def search_with_timeout(query: str, timeout: float = SEARCH_TIMEOUT_SECONDS) -> str:
+    """cached_search with a deadline; returns SEARCH_TIMEOUT_MESSAGE instead of blocking past it"""
+    future = _search_pool.submit(cached_search, query)
+    try:
+        return future.result(timeout=timeout)
+    except FuturesTimeoutError:
+        return SEARCH_TIMEOUT_MESSAGE
+
+def search_many_with_timeout(queries: list[str], timeout: float = SEARCH_TIMEOUT_SECONDS) -> list[str]:
+    """Run cached_search for every query concurrently; results keep query order.
+
+    The rate limiter admits RATE_LIMIT_BURST scrapes at once and then one per second, so the
+    shared deadline is timeout plus the time the bucket needs to cover every query. Cache hits
+    take no token, which only makes the deadline generous.
+    """
+    deadline = timeout + rate_limit_delay(len(queries))
+    futures = [_search_pool.submit(cached_search, query) for query in queries]
+    wait(futures, timeout=deadline)
+    return [future.result() if future.done() else SEARCH_TIMEOUT_MESSAGE for future in futures]
+
+def speculate(query: str) -> Tuple[Optional[str], Future]:
+    """Best cached guess for query right away, plus a future for the real cached_search result"""
+    search = _search_pool.submit(cached_search, query)
+    normalized_query = query.strip().lower()
+    guess = _persistent_get(normalized_query) or _semantic_lookup(_embed(normalized_query), SPECULATION_THRESHOLD)
+    return guess, search
+
+def warm_cache(queries: list[str]):
+    """Fill the caches for queries one at a time, at lower priority than user searches.
+
+    A warm-up scrape only starts when the rate limiter's bucket is full, so user requests never
+    wait for tokens spent on warm-up. Blocks until done; run it on a background thread.
+    """
+    for query in queries:
+        while (delay := rate_limit_delay(int(RATE_LIMIT_BURST))) > 0:
+            time.sleep(delay)
+        _search_pool.submit(cached_search, query).result()
+
+async def cached_search_async(query: str, session, timeout: float = SEARCH_TIMEOUT_SECONDS) -> str:
+    """Async cached_search over a shared aiohttp session; identical queries hit the semantic cache"""
+    normalized_query = query.strip().lower()
+    cached = await asyncio.to_thread(_persistent_get, normalized_query)
+    if cached:
+        return cached
+
+    embedding = await asyncio.to_thread(_embed, normalized_query)
+    cached = _semantic_lookup(embedding)
+    if cached:
+        return cached
+
+    try:
+        result = await asyncio.wait_for(
+            search_youtube_scrape_async(normalized_query, session), timeout
+        )
+    except asyncio.TimeoutError:
+        return SEARCH_TIMEOUT_MESSAGE
+    _semantic_store(embedding, result)
+    if result.startswith("https://"):
+        await asyncio.to_thread(_persistent_set, normalized_query, result)
+    return result
 
 @tool
 def youtube_search_tool(query: str) -> str:
     """
     Search YouTube for a video matching the given query and return the first link.
-    Does not use YouTube API — scrapes Google search results.
+    Does not use YouTube API — scrapes YouTube search results.
     """
-    return search_youtube_scrape(query)
+    return search_with_timeout(query)
+
+@tool
+def youtube_batch_search_tool(queries: list[str]) -> list[str]:
+    """
+    Search YouTube for several queries at once and return one link per query, in order.
+    Use this instead of calling youtube_search_tool repeatedly when more than one video is needed.
+    Up to 3 new queries cost about one search; each further uncached query adds about a second.
+    """
+    # Thread pool rather than asyncio.run: the tool may be called from inside a running event loop
+    return search_many_with_timeout(queries)
+
+__all__ = [
+    "cached_search",
+    "cached_search_async",
+    "search_youtube_scrape",
+    "search_youtube_scrape_async",
+    "search_many_with_timeout",
+    "search_with_timeout",
+    "speculate",
+    "warm_cache",
+    "youtube_batch_search_tool",
+    "youtube_search_tool",
+]